@@ -1,40 +1,166 @@
 # -*- coding: utf-8 -*-
-import json
 import time
-import requests
+START_TIME = time.perf_counter()
+
+import argparse
+import json
+import math
+import contextlib
+import contextvars
+import copy
+import hashlib
+import urllib.parse
+import threading
+import weakref
 import logging
+import sqlite3
 import random
+import shutil
 import os
 import sys
 import io
 import re
-from playwright_stealth.sync import stealth_sync
 try:
-    import psutil
+    import fcntl
 except ImportError:
-    import subprocess
-    import sys
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "psutil"])
-    import psutil
-from playwright.sync_api import sync_playwright, TimeoutError
+    fcntl = None  # Windows: ohne Dateisperre
 
-def is_low_memory():
-    #Erkennt schwache Server (unter 2 GB RAM)
-    total_ram = psutil.virtual_memory().total / (1024**3)
-    return total_ram <= 2.0
+# Playwright, playwright_stealth, psutil, requests und asyncio werden erst geladen, wenn sie gebraucht werden -
+# ein Durchlauf, der nur den Update-Check oder den HTTP-Schnellpfad braucht, startet so in Millisekunden
+sync_playwright = None
+stealth_sync = None
 
-def get_launch_args(browser):
-    if browser == "chromium" and is_low_memory():
-        return ["--no-sandbox", "--disable-dev-shm-usage"]
-    else:
-        return []
+
+def load_playwright():
+    global sync_playwright, stealth_sync, TimeoutError
+    if sync_playwright is None:
+        start = time.perf_counter()
+        from playwright_stealth.sync import stealth_sync
+        from playwright.sync_api import sync_playwright, TimeoutError
+        METRICS.observe("import_playwright", time.perf_counter() - start)
+
+
+def load_psutil():
+    try:
+        import psutil
+    except ImportError:
+        import subprocess
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "psutil"])
+        import psutil
+    return psutil
+
+def total_memory_mb():
+    """Arbeitsspeicher in MB - ein Container-Limit (cgroup v2/v1) zählt, wenn es kleiner ist"""
+    total = load_psutil().virtual_memory().total
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path, "r") as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            total = min(total, int(value))
+    return total / (1024 ** 2)
+
+def is_low_memory():
+    #Erkennt schwache Server (unter 2 GB RAM, auch als Container-Limit)
+    return total_memory_mb() <= 2048
+
+
+# Startprofile: je kleiner das Speicherbudget, desto sparsamer wird der Browser gestartet
+LAUNCH_PROFILES = ("default", "lean", "minimal")
+
+CHROMIUM_LEAN_ARGS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--renderer-process-limit=2",
+]
+CHROMIUM_MINIMAL_ARGS = [
+    "--renderer-process-limit=1",
+    "--disable-site-isolation-trials",
+    "--disable-features=site-per-process,IsolateOrigins,Translate",
+]
+
+FIREFOX_LEAN_PREFS = {
+    "dom.ipc.processCount": 2,
+    "browser.cache.memory.capacity": 16384,
+    "browser.sessionhistory.max_total_viewers": 0,
+    "network.prefetch-next": False,
+}
+FIREFOX_MINIMAL_PREFS = {
+    "dom.ipc.processCount": 1,
+    "dom.ipc.processPrelaunch.enabled": False,
+    "fission.autostart": False,
+    "browser.cache.memory.capacity": 8192,
+}
+
+
+def memory_budget_mb():
+    """Budget für Browser und Playwright-Treiber: MEMORY_BUDGET_MB oder die Hälfte des gesamten Speichers"""
+    return MEMORY_BUDGET_MB or int(total_memory_mb() / 2)
+
+
+def launch_profile(budget_mb):
+    if LAUNCH_PROFILE in LAUNCH_PROFILES:
+        return LAUNCH_PROFILE
+    if budget_mb < 512:
+        return "minimal"
+    if budget_mb < 1024:
+        return "lean"
+    return "default"
+
+
+def launch_options(browser, budget_mb):
+    """Startoptionen für engine.launch() passend zu Profil und Speicherbudget"""
+    profile = launch_profile(budget_mb)
+    args = []
+    prefs = {}
+    if browser == "chromium":
+        if is_low_memory() or profile != "default":
+            args += ["--no-sandbox", "--disable-dev-shm-usage"]
+        if profile != "default":
+            # JS-Heap auf einen Teil des Budgets begrenzen
+            heap = max(64, budget_mb // (4 if profile == "lean" else 6))
+            args += CHROMIUM_LEAN_ARGS + [f"--js-flags=--max-old-space-size={heap}"]
+        if profile == "minimal":
+            args = [a for a in args if not a.startswith("--renderer-process-limit")] + CHROMIUM_MINIMAL_ARGS
+    elif browser == "firefox" and profile != "default":
+        prefs.update(FIREFOX_LEAN_PREFS)
+        prefs["javascript.options.mem.max"] = max(64, budget_mb // 4) * 1024
+        if profile == "minimal":
+            prefs.update(FIREFOX_MINIMAL_PREFS)
+
+    logging.info(f"Startprofil {profile} für {browser} (Speicherbudget {budget_mb} MB)")
+    options = {"args": args}
+    if prefs:
+        options["firefox_user_prefs"] = prefs
+    return options
+
+
+def over_memory_budget(budget_mb):
+    """True, wenn Browser und Treiber zusammen mehr als das Budget belegen"""
+    used = METRICS.record_browser_resources()
+    if not budget_mb or used is None or used / 1024 ** 2 <= budget_mb:
+        return False
+    logging.warning(f"Browser belegt {used / 1024 ** 2:.0f} MB (Budget {budget_mb} MB) - wird vorsorglich neu gestartet.")
+    METRICS.inc("browser_recycles_total", reason="memory")
+    return True
 
 
 
 # Logging einrichten
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+# Nur einmal umhängen - sonst schließt ein erneutes Laden (z. B. benchmark.py) die alten Streams
+if (sys.stdout.encoding or "").lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+if (sys.stderr.encoding or "").lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 LOGIN_URL = "https://login.alditalk-kundenbetreuung.de/signin/XUI/#login/"
 DASHBOARD_URL = "https://www.alditalk-kundenportal.de/user/auth/account-overview/"
@@ -59,11 +185,60 @@ def load_config():
         "AUTO_UPDATE": os.getenv("AUTO_UPDATE"),
         "SLEEP_MODE": os.getenv("SLEEP_MODE"),
         "SLEEP_INTERVAL": os.getenv("SLEEP_INTERVAL"),
-        "BROWSER": os.getenv("BROWSER")
+        "BROWSER": os.getenv("BROWSER"),
+        "BROWSER_RECYCLE_RUNS": os.getenv("BROWSER_RECYCLE_RUNS"),
+        "ACCOUNTS_FILE": os.getenv("ACCOUNTS_FILE"),
+        "MAX_CONCURRENCY": os.getenv("MAX_CONCURRENCY"),
+        "HTTP_FASTPATH": os.getenv("HTTP_FASTPATH"),
+        "USAGE_API_URL": os.getenv("USAGE_API_URL"),
+        "CAPTURE_TIMEOUT": os.getenv("CAPTURE_TIMEOUT"),
+        "READY_TIMEOUT": os.getenv("READY_TIMEOUT"),
+        "TYPE_DELAY": os.getenv("TYPE_DELAY"),
+        "REQUEST_FILTER": os.getenv("REQUEST_FILTER"),
+        "BLOCK_RESOURCE_TYPES": os.getenv("BLOCK_RESOURCE_TYPES"),
+        "BLOCK_DOMAINS": os.getenv("BLOCK_DOMAINS"),
+        "ALLOW_DOMAINS": os.getenv("ALLOW_DOMAINS"),
+        "BLOCK_URL_PATTERNS": os.getenv("BLOCK_URL_PATTERNS"),
+        "METRICS_PORT": os.getenv("METRICS_PORT"),
+        "LOGIN_URL": os.getenv("LOGIN_URL"),
+        "DASHBOARD_URL": os.getenv("DASHBOARD_URL"),
+        "PREDICTIVE_MIN_INTERVAL": os.getenv("PREDICTIVE_MIN_INTERVAL"),
+        "PREDICTIVE_MAX_INTERVAL": os.getenv("PREDICTIVE_MAX_INTERVAL"),
+        "PREDICTIVE_SAFETY": os.getenv("PREDICTIVE_SAFETY"),
+        "HISTORY": os.getenv("HISTORY"),
+        "HISTORY_RAW_DAYS": os.getenv("HISTORY_RAW_DAYS"),
+        "HISTORY_MAX_ROWS": os.getenv("HISTORY_MAX_ROWS"),
+        "TELEGRAM_API_URL": os.getenv("TELEGRAM_API_URL"),
+        "TELEGRAM_BATCH_SECONDS": os.getenv("TELEGRAM_BATCH_SECONDS"),
+        "UPDATE_CHECK_HOURS": os.getenv("UPDATE_CHECK_HOURS"),
+        "LAUNCH_PROFILE": os.getenv("LAUNCH_PROFILE"),
+        "MEMORY_BUDGET_MB": os.getenv("MEMORY_BUDGET_MB"),
+        "KEEPALIVE": os.getenv("KEEPALIVE"),
+        "KEEPALIVE_URL": os.getenv("KEEPALIVE_URL"),
+        "KEEPALIVE_SAFETY": os.getenv("KEEPALIVE_SAFETY"),
+        "PHASE_RETRIES": os.getenv("PHASE_RETRIES"),
+        "BREAKER_THRESHOLD": os.getenv("BREAKER_THRESHOLD"),
+        "BREAKER_MAX_INTERVAL": os.getenv("BREAKER_MAX_INTERVAL"),
+        "PROFILE": os.getenv("PROFILE"),
+        "PROFILE_THRESHOLD": os.getenv("PROFILE_THRESHOLD"),
+        "PROFILE_KEEP": os.getenv("PROFILE_KEEP"),
+        "PROFILE_MAX_MB": os.getenv("PROFILE_MAX_MB"),
+        "HEDGE": os.getenv("HEDGE"),
+        "HEDGE_BROWSER": os.getenv("HEDGE_BROWSER"),
+        "HEDGE_DELAY": os.getenv("HEDGE_DELAY"),
+        "TOPUP_BURST_MAX": os.getenv("TOPUP_BURST_MAX"),
+        "TOPUP_CONFIRM_TIMEOUT": os.getenv("TOPUP_CONFIRM_TIMEOUT"),
+        "WORKER": os.getenv("WORKER"),
+        "WORKER_ID": os.getenv("WORKER_ID"),
+        "LEASE_SECONDS": os.getenv("LEASE_SECONDS"),
+        "REMOTE_BROWSER": os.getenv("REMOTE_BROWSER"),
+        "REMOTE_FALLBACK": os.getenv("REMOTE_FALLBACK"),
+        "REMOTE_RETRY": os.getenv("REMOTE_RETRY"),
+        "USAGE_URL_PATTERN": os.getenv("USAGE_URL_PATTERN")
     }
     
     # Check if we have the required environment variables
-    if config["RUFNUMMER"] and config["PASSWORT"]:
+    if (config["RUFNUMMER"] and config["PASSWORT"]) or config["ACCOUNTS_FILE"]:
         logging.info("Verwende Konfiguration aus Umgebungsvariablen")
         # Set defaults for optional values
         config["TELEGRAM"] = config["TELEGRAM"] or "0"
@@ -87,8 +262,8 @@ def load_config():
                 with open(config_file, "r") as f:
                     config = json.load(f)
             else:
-                logging.error("Keine Konfiguration gefunden! Bitte config.json, Umgebungsvariablen oder Docker Secrets bereitstellen.")
-                sys.exit(1)
+                # Abgebrochen wird erst beim Start (has_credentials) - so bleibt das Skript importierbar
+                config["BROWSER"] = config["BROWSER"] or "chromium"
 
     valid_browsers = ["chromium", "firefox", "webkit"]
     browser = config.get("BROWSER", "chromium").lower()
@@ -116,7 +291,56 @@ def load_docker_secrets():
         "AUTO_UPDATE": "at_extender_auto_update",
         "SLEEP_MODE": "at_extender_sleep_mode",
         "SLEEP_INTERVAL": "at_extender_sleep_interval",
-        "BROWSER": "at_extender_browser"
+        "BROWSER": "at_extender_browser",
+        "BROWSER_RECYCLE_RUNS": "at_extender_browser_recycle_runs",
+        "ACCOUNTS_FILE": "at_extender_accounts_file",
+        "MAX_CONCURRENCY": "at_extender_max_concurrency",
+        "HTTP_FASTPATH": "at_extender_http_fastpath",
+        "USAGE_API_URL": "at_extender_usage_api_url",
+        "CAPTURE_TIMEOUT": "at_extender_capture_timeout",
+        "READY_TIMEOUT": "at_extender_ready_timeout",
+        "TYPE_DELAY": "at_extender_type_delay",
+        "REQUEST_FILTER": "at_extender_request_filter",
+        "BLOCK_RESOURCE_TYPES": "at_extender_block_resource_types",
+        "BLOCK_DOMAINS": "at_extender_block_domains",
+        "ALLOW_DOMAINS": "at_extender_allow_domains",
+        "BLOCK_URL_PATTERNS": "at_extender_block_url_patterns",
+        "METRICS_PORT": "at_extender_metrics_port",
+        "LOGIN_URL": "at_extender_login_url",
+        "DASHBOARD_URL": "at_extender_dashboard_url",
+        "PREDICTIVE_MIN_INTERVAL": "at_extender_predictive_min_interval",
+        "PREDICTIVE_MAX_INTERVAL": "at_extender_predictive_max_interval",
+        "PREDICTIVE_SAFETY": "at_extender_predictive_safety",
+        "HISTORY": "at_extender_history",
+        "HISTORY_RAW_DAYS": "at_extender_history_raw_days",
+        "HISTORY_MAX_ROWS": "at_extender_history_max_rows",
+        "TELEGRAM_API_URL": "at_extender_telegram_api_url",
+        "TELEGRAM_BATCH_SECONDS": "at_extender_telegram_batch_seconds",
+        "UPDATE_CHECK_HOURS": "at_extender_update_check_hours",
+        "LAUNCH_PROFILE": "at_extender_launch_profile",
+        "MEMORY_BUDGET_MB": "at_extender_memory_budget_mb",
+        "KEEPALIVE": "at_extender_keepalive",
+        "KEEPALIVE_URL": "at_extender_keepalive_url",
+        "KEEPALIVE_SAFETY": "at_extender_keepalive_safety",
+        "PHASE_RETRIES": "at_extender_phase_retries",
+        "BREAKER_THRESHOLD": "at_extender_breaker_threshold",
+        "BREAKER_MAX_INTERVAL": "at_extender_breaker_max_interval",
+        "PROFILE": "at_extender_profile",
+        "PROFILE_THRESHOLD": "at_extender_profile_threshold",
+        "PROFILE_KEEP": "at_extender_profile_keep",
+        "PROFILE_MAX_MB": "at_extender_profile_max_mb",
+        "HEDGE": "at_extender_hedge",
+        "HEDGE_BROWSER": "at_extender_hedge_browser",
+        "HEDGE_DELAY": "at_extender_hedge_delay",
+        "TOPUP_BURST_MAX": "at_extender_topup_burst_max",
+        "TOPUP_CONFIRM_TIMEOUT": "at_extender_topup_confirm_timeout",
+        "WORKER": "at_extender_worker",
+        "WORKER_ID": "at_extender_worker_id",
+        "LEASE_SECONDS": "at_extender_lease_seconds",
+        "REMOTE_BROWSER": "at_extender_remote_browser",
+        "REMOTE_FALLBACK": "at_extender_remote_fallback",
+        "REMOTE_RETRY": "at_extender_remote_retry",
+        "USAGE_URL_PATTERN": "at_extender_usage_url_pattern"
     }
     
     for key, secret_file in secret_files.items():
@@ -129,16 +353,20 @@ def load_docker_secrets():
                 logging.warning(f"Konnte Secret {secret_file} nicht lesen: {e}")
     
     # Check if we have the required secrets
-    if config.get("RUFNUMMER") and config.get("PASSWORT"):
+    if (config.get("RUFNUMMER") and config.get("PASSWORT")) or config.get("ACCOUNTS_FILE"):
         return config
     
     return None
 
 
+def has_credentials(config):
+    return bool((config.get("RUFNUMMER") and config.get("PASSWORT")) or config.get("ACCOUNTS") or config.get("ACCOUNTS_FILE"))
+
+
 config = load_config()
 
-RUFNUMMER = config["RUFNUMMER"]
-PASSWORT = config["PASSWORT"]
+RUFNUMMER = config.get("RUFNUMMER")
+PASSWORT = config.get("PASSWORT")
 BOT_TOKEN = config["BOT_TOKEN"]
 CHAT_ID = config["CHAT_ID"]
 AUTO_UPDATE = config["AUTO_UPDATE"]
@@ -146,8 +374,77 @@ TELEGRAM = config["TELEGRAM"]
 SLEEP_MODE = config["SLEEP_MODE"]
 SLEEP_INTERVAL = config["SLEEP_INTERVAL"]
 BROWSER = config["BROWSER"]
-
-TELEGRAM_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+# Portal-URLs lassen sich überschreiben, z. B. für das lokale mock_portal.py
+LOGIN_URL = config.get("LOGIN_URL") or LOGIN_URL
+DASHBOARD_URL = config.get("DASHBOARD_URL") or DASHBOARD_URL
+# Nach so vielen Durchläufen wird der dauerhaft laufende Browser neu gestartet (0 = nie)
+BROWSER_RECYCLE_RUNS = int(config.get("BROWSER_RECYCLE_RUNS") or 20)
+# Wie viele Konten im Multi-Account-Modus gleichzeitig geprüft werden
+MAX_CONCURRENCY = int(config.get("MAX_CONCURRENCY") or 3)
+# Datenvolumen per HTTP mit den gespeicherten Cookies lesen, Browser nur für Login und Nachbuchung
+HTTP_FASTPATH = config.get("HTTP_FASTPATH") or "0"
+USAGE_API_URL = config.get("USAGE_API_URL") or ""
+# Wie lange (Sekunden) höchstens auf die Verbrauchsdaten aus dem Netzwerk gewartet wird - steht der Meter früher, wird die Seite ausgelesen
+CAPTURE_TIMEOUT = float(config.get("CAPTURE_TIMEOUT") or 10)
+USAGE_METER_SELECTOR = "one-stack.usage-meter"
+# Obergrenze (Sekunden) für das Warten auf Dashboard/Login statt fester Pausen
+READY_TIMEOUT = float(config.get("READY_TIMEOUT") or 30)
+READY_POLL_MS = 100
+# Verzögerung (ms) pro Zeichen beim Eintippen der Zugangsdaten, 0 = direkt befüllen
+TYPE_DELAY = int(config.get("TYPE_DELAY") or 0)
+# Request-Filter: "1" = an, "0" = aus, "auto" = nur auf schwachen Servern (is_low_memory)
+REQUEST_FILTER = (config.get("REQUEST_FILTER") or "auto").lower()
+# Port für den Prometheus-Endpunkt /metrics (leer = aus)
+METRICS_PORT = int(config.get("METRICS_PORT") or 0)
+# Grenzen und Sicherheitsfaktor für SLEEP_MODE=predictive
+PREDICTIVE_MIN_INTERVAL = int(config.get("PREDICTIVE_MIN_INTERVAL") or 60)
+PREDICTIVE_MAX_INTERVAL = int(config.get("PREDICTIVE_MAX_INTERVAL") or 3600)
+PREDICTIVE_SAFETY = float(config.get("PREDICTIVE_SAFETY") or 0.5)
+# Verlauf aller Durchläufe in history.db: volle Auflösung für HISTORY_RAW_DAYS Tage, danach stündlich, höchstens HISTORY_MAX_ROWS Zeilen
+HISTORY = config.get("HISTORY") or "1"
+HISTORY_RAW_DAYS = float(config.get("HISTORY_RAW_DAYS") or 14)
+HISTORY_MAX_ROWS = int(config.get("HISTORY_MAX_ROWS") or 50000)
+# Telegram: Basis-URL der Bot API (z. B. lokaler Stub) und Sammelfenster für Digest-Nachrichten in Sekunden
+TELEGRAM_API_URL = (config.get("TELEGRAM_API_URL") or "https://api.telegram.org").rstrip("/")
+TELEGRAM_BATCH_SECONDS = float(config.get("TELEGRAM_BATCH_SECONDS") or 3)
+# Abstand der Update-Prüfungen in Stunden
+UPDATE_CHECK_HOURS = float(config.get("UPDATE_CHECK_HOURS") or 6)
+# Startprofil des Browsers (auto/default/lean/minimal) und Speicherbudget in MB (0 = Hälfte des verfügbaren Speichers)
+LAUNCH_PROFILE = (config.get("LAUNCH_PROFILE") or "auto").lower()
+MEMORY_BUDGET_MB = int(config.get("MEMORY_BUDGET_MB") or 0)
+# Session-Keep-alive zwischen den Prüfungen: an/aus, eigene URL (sonst Verbrauchs-Endpunkt bzw. Dashboard) und Anteil des gemessenen Timeouts
+KEEPALIVE = config.get("KEEPALIVE") or "1"
+KEEPALIVE_URL = config.get("KEEPALIVE_URL") or ""
+KEEPALIVE_SAFETY = float(config.get("KEEPALIVE_SAFETY") or 0.8)
+# Wiederholungen pro Phase sowie Circuit Breaker: ab so vielen Fehlschlägen in Folge gilt das Portal als gestört, Intervall wächst bis zum Maximum (Sekunden)
+PHASE_RETRIES = int(config.get("PHASE_RETRIES") or 3)
+BREAKER_THRESHOLD = int(config.get("BREAKER_THRESHOLD") or 3)
+BREAKER_MAX_INTERVAL = int(config.get("BREAKER_MAX_INTERVAL") or 3600)
+# Profiling: Playwright-Trace, DOM und Phasen-Zeiten nur bei langsamen (Sekunden) oder fehlgeschlagenen Durchläufen aufheben, begrenzt auf Anzahl und MB
+PROFILE = str(config.get("PROFILE") or "0")
+PROFILE_THRESHOLD = float(config.get("PROFILE_THRESHOLD") or 30)
+PROFILE_KEEP = int(config.get("PROFILE_KEEP") or 20)
+PROFILE_MAX_MB = int(config.get("PROFILE_MAX_MB") or 200)
+# Hedging: liefert der Browser nach dem p95 der bisherigen Durchläufe (oder HEDGE_DELAY Sekunden) kein Ergebnis, startet ein zweiter Check mit HEDGE_BROWSER
+HEDGE = str(config.get("HEDGE") or "0")
+HEDGE_BROWSER = config.get("HEDGE_BROWSER") or ("chromium" if config["BROWSER"] == "firefox" else "firefox")
+HEDGE_DELAY = float(config.get("HEDGE_DELAY") or 20)
+# Nachbuchen: höchstens so viele Buchungen pro Durchlauf, jede wird im selben Kontext bestätigt (Wartezeit in Sekunden)
+TOPUP_BURST_MAX = int(config.get("TOPUP_BURST_MAX") or 3)
+TOPUP_CONFIRM_TIMEOUT = float(config.get("TOPUP_CONFIRM_TIMEOUT") or 15)
+# Worker-Modus: mehrere Replikas teilen sich DATA_DIR und holen sich Konten über Leases (Dauer in Sekunden)
+WORKER = str(config.get("WORKER") or "0")
+WORKER_ID = config.get("WORKER_ID") or ""
+LEASE_SECONDS = int(config.get("LEASE_SECONDS") or 300)
+# Entfernter Browser: ws://... (Playwright-Server, gleiche Engine wie BROWSER) oder http://... (Chromium über CDP).
+# Ist er nicht erreichbar, wird lokal gestartet (REMOTE_FALLBACK=0 schaltet das ab) und nach REMOTE_RETRY Sekunden erneut verbunden
+REMOTE_BROWSER = config.get("REMOTE_BROWSER") or ""
+REMOTE_FALLBACK = str(config.get("REMOTE_FALLBACK") or "1")
+REMOTE_RETRY = int(config.get("REMOTE_RETRY") or 300)
+# Nur Antworten von URLs, die auf dieses Muster passen (regulärer Ausdruck), gelten als Verbrauchsdaten
+USAGE_URL_PATTERN = config.get("USAGE_URL_PATTERN") or r"usage|verbrauch|consumption|volumen|volume|topup|nachbuch|booking"
+
+TELEGRAM_URL = f"{TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendMessage"
 
 LAST_GB = 0.0
 
@@ -156,38 +453,321 @@ DATA_DIR = os.getenv("DATA_DIR", "/app/data" if os.path.exists("/app/data") else
 STATE_FILE = os.path.join(DATA_DIR, "state.json")
 COOKIE_FILE = os.path.join(DATA_DIR, "cookies.json")
 
-# Ensure data directory exists
-os.makedirs(DATA_DIR, exist_ok=True)
 
-try:
-    with open(STATE_FILE, "r") as f:
-        data = json.load(f)
-        if isinstance(data, dict) and "last_gb" in data:
-            LAST_GB = float(data["last_gb"])
-        else:
-            raise ValueError("Ungültiges Format in state.json - setze zurück.")
-except Exception as e:
+
+def load_accounts(config):
+    """Liefert alle zu prüfenden Konten - aus ACCOUNTS (config.json), ACCOUNTS_FILE oder RUFNUMMER/PASSWORT"""
+    accounts = config.get("ACCOUNTS")
+    accounts_file = config.get("ACCOUNTS_FILE")
+    if not accounts and accounts_file:
+        with open(accounts_file, "r") as f:
+            accounts = json.load(f)
+
+    if not accounts:
+        return [{"RUFNUMMER": RUFNUMMER, "PASSWORT": PASSWORT, "STATE_FILE": STATE_FILE, "COOKIE_FILE": COOKIE_FILE}]
+
+    result = []
+    for entry in accounts:
+        if not entry.get("RUFNUMMER") or not entry.get("PASSWORT"):
+            logging.warning("Konto ohne RUFNUMMER oder PASSWORT in der Kontenliste wird übersprungen.")
+            continue
+        # Jedes Konto bekommt eigene State- und Cookie-Dateien im DATA_DIR
+        suffix = re.sub(r"[^0-9A-Za-z]", "", str(entry["RUFNUMMER"]))
+        result.append({
+            "RUFNUMMER": str(entry["RUFNUMMER"]),
+            "PASSWORT": entry["PASSWORT"],
+            "STATE_FILE": os.path.join(DATA_DIR, f"state_{suffix}.json"),
+            "COOKIE_FILE": os.path.join(DATA_DIR, f"cookies_{suffix}.json")
+        })
+    return result
+
+
+# Persistenz: atomar schreiben (Temp-Datei + fsync + rename), unveränderte Inhalte gar nicht schreiben,
+# Lesen aus dem Speicher solange sich die Datei nicht geändert hat, Dateisperre für geteilte Datenverzeichnisse
+FILE_CACHE = {}
+FILE_CACHE_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def file_lock(path, exclusive=True):
+    if fcntl is None:
+        yield
+        return
+    # Sperrdateien in einem eigenen Unterordner, damit sie DATA_DIR nicht zumüllen
+    lock_dir = os.path.join(os.path.dirname(path) or ".", ".locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, os.path.basename(path) + ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def file_signature(path):
     try:
-        with open(STATE_FILE, "w") as f:
-            json.dump({"last_gb": 0.0}, f)
-    except Exception as save_error:
-        logging.error(f"Konnte 'state.json' nicht neu erstellen: {save_error}")
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
 
-def send_telegram_message(message, retries=3):
-    if TELEGRAM == "1":
-        for attempt in range(retries):
+def read_json(path, default=None):
+    """JSON-Datei lesen - aus dem Cache, solange Änderungszeit und Größe gleich bleiben"""
+    signature = file_signature(path)
+    if signature is None:
+        return copy.deepcopy(default)
+    with FILE_CACHE_LOCK:
+        cached = FILE_CACHE.get(path)
+    if cached and cached[0] == signature:
+        return copy.deepcopy(cached[2])
+
+    try:
+        with file_lock(path, exclusive=False):
+            signature = file_signature(path)
+            with open(path, "rb") as f:
+                raw = f.read()
+        data = json.loads(raw)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Konnte {os.path.basename(path)} nicht lesen: {e}")
+        return copy.deepcopy(default)
+    with FILE_CACHE_LOCK:
+        FILE_CACHE[path] = (signature, hashlib.sha256(raw).hexdigest(), data)
+    return copy.deepcopy(data)
+
+
+def write_json(path, data):
+    """Atomar schreiben, wenn sich der Inhalt geändert hat. True, wenn geschrieben wurde"""
+    raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    with file_lock(path):
+        signature = file_signature(path)
+        with FILE_CACHE_LOCK:
+            cached = FILE_CACHE.get(path)
+        if signature is not None and cached and cached[0] == signature and cached[1] == digest:
+            return False
+
+        write_atomic(path, raw)
+        with FILE_CACHE_LOCK:
+            FILE_CACHE[path] = (file_signature(path), digest, copy.deepcopy(data))
+    return True
+
+
+def write_atomic(path, raw):
+    """Temp-Datei im selben Verzeichnis, fsync, dann ersetzen - nie eine halb geschriebene Datei"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_text(path, text):
+    with file_lock(path):
+        write_atomic(path, text.encode("utf-8"))
+
+
+def save_storage_state(context, path):
+    """Cookies und Local Storage des Kontexts sichern - nur wenn sich etwas geändert hat"""
+    return write_json(path, context.storage_state())
+
+
+def load_last_gb(state_file):
+    data = read_json(state_file)
+    if isinstance(data, dict) and "last_gb" in data:
+        return float(data["last_gb"])
+    return 0.0
+
+
+def save_last_gb(state_file, last_gb):
+    try:
+        # checked_at dient healthcheck.py als Lebenszeichen, auch wenn sich der GB-Wert nicht ändert
+        write_json(state_file, {"last_gb": last_gb, "checked_at": round(time.time())})
+    except Exception as e:
+        logging.warning(f"Fehler beim Speichern des GB-Werts: {e}")
+
+def init_state():
+    """Datenverzeichnis anlegen und den letzten GB-Wert laden - erst beim Start, nicht beim Import"""
+    global LAST_GB
+    # Ensure data directory exists
+    os.makedirs(DATA_DIR, exist_ok=True)
+    data = read_json(STATE_FILE)
+    if isinstance(data, dict) and "last_gb" in data:
+        LAST_GB = float(data["last_gb"])
+        return
+
+    # Nicht auf 0.0 GB zurückfallen (würde das 60s-Intervall auslösen), solange der Verlauf einen Wert kennt
+    readings = HISTORY_STORE.readings(RUFNUMMER) if HISTORY_STORE is not None and os.path.exists(HISTORY_FILE) else []
+    if readings:
+        LAST_GB = readings[-1][1]
+    if data is not None or os.path.exists(STATE_FILE):
+        logging.warning(f"Ungültiges Format in state.json - setze auf {LAST_GB:.2f} GB zurück.")
+    save_last_gb(STATE_FILE, LAST_GB)
+
+
+def worker_id():
+    if WORKER_ID:
+        return WORKER_ID
+    import socket
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+# Telegram: Nachrichten landen in einer Warteschlange und werden im Hintergrund gesendet,
+# damit ein langsames api.telegram.org nie den Browser-Durchlauf aufhält.
+# Im Worker-Modus hat jeder Worker seine eigene Warteschlange im geteilten Datenverzeichnis
+TELEGRAM_QUEUE_FILE = os.path.join(DATA_DIR, "telegram_queue_%s.json" % re.sub(r"[^\w.-]", "_", worker_id())
+                                   if WORKER == "1" else "telegram_queue.json")
+TELEGRAM_MAX_LENGTH = 4096
+TELEGRAM_TIMEOUT = (5, 15)
+TELEGRAM_MAX_BACKOFF = 300
+
+
+class TelegramNotifier:
+    """Hintergrund-Versand mit gepoolter Session, Backoff, retry_after und Digest-Nachrichten"""
+
+    def __init__(self, url, chat_id, queue_file, batch_seconds=3):
+        self.url = url
+        self.chat_id = chat_id
+        self.queue_file = queue_file
+        self.batch_seconds = batch_seconds
+        self.condition = threading.Condition()
+        self.pending = None
+        self.sending = False
+        self.draining = False
+        self.thread = None
+        self.session = None
+
+    def load_queue(self):
+        """Nicht zugestellte Nachrichten vom letzten Lauf übernehmen"""
+        with self.condition:
+            if self.pending is not None:
+                return
+            self.pending = [str(m) for m in read_json(self.queue_file, [])]
+            if self.pending:
+                logging.info(f"Telegram: {len(self.pending)} Nachricht(en) aus der Warteschlange übernommen.")
+
+    def save_queue(self):
+        try:
+            write_json(self.queue_file, self.pending)
+        except Exception as e:
+            logging.warning(f"Konnte Telegram-Warteschlange nicht speichern: {e}")
+
+    def send(self, message):
+        self.load_queue()
+        with self.condition:
+            self.pending.append(message)
+            self.save_queue()
+            self.condition.notify()
+        self.start()
+
+    def start(self):
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="telegram", daemon=True)
+                self.thread.start()
+
+    def take_batch(self):
+        """Alle Nachrichten des Sammelfensters zu möglichst wenigen Digests zusammenfassen"""
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+            deadline = time.monotonic() + self.batch_seconds
+            while not self.draining and time.monotonic() < deadline:
+                self.condition.wait(deadline - time.monotonic())
+            text = self.pending[0][:TELEGRAM_MAX_LENGTH]
+            count = 1
+            for message in self.pending[1:]:
+                if len(text) + 1 + len(message) > TELEGRAM_MAX_LENGTH:
+                    break
+                text += "\n" + message
+                count += 1
+            self.sending = True
+            return text, count
+
+    def done(self, count):
+        with self.condition:
+            del self.pending[:count]
+            self.sending = False
+            self.save_queue()
+            self.condition.notify_all()
+
+    def post(self, text):
+        """Ein Sendeversuch: Wartezeit in Sekunden bei Fehlschlag, None bei Erfolg oder endgültigem Fehler"""
+        import requests
+        if self.session is None:
+            self.session = requests.Session()
+        start = time.monotonic()
+        try:
+            response = self.session.post(self.url, data={"chat_id": self.chat_id, "text": text}, timeout=TELEGRAM_TIMEOUT)
+        except requests.RequestException as e:
+            logging.warning(f"Telegram nicht erreichbar: {e}")
+            return 0
+        finally:
+            METRICS.observe("telegram_send", time.monotonic() - start)
+
+        if response.status_code == 200:
+            logging.info("Telegram-Nachricht erfolgreich gesendet.")
+            return None
+        if response.status_code == 429:
             try:
-                response = requests.post(TELEGRAM_URL, data={"chat_id": CHAT_ID, "text": message})
-                if response.status_code == 200:
-                    logging.info("Telegram-Nachricht erfolgreich gesendet.")
-                    return True
-                else:
-                    logging.warning(f"Fehler beim Senden (Versuch {attempt+1}): {response.text}")
-            except Exception as e:
-                logging.error(f"Fehler beim Telegram-Senden (Versuch {attempt+1}): {e}")
-        logging.error("Telegram konnte nicht erreicht werden.")
-        return False
+                retry_after = response.json()["parameters"]["retry_after"]
+            except Exception:
+                retry_after = 30
+            logging.warning(f"Telegram Rate-Limit - neuer Versuch in {retry_after}s.")
+            return retry_after
+        if 400 <= response.status_code < 500:
+            # Falscher Token, falsche Chat-ID, ... - erneut senden hilft nicht
+            logging.error(f"Telegram hat die Nachricht abgelehnt: {response.text}")
+            return None
+        logging.warning(f"Fehler beim Senden ({response.status_code}): {response.text}")
+        return 0
+
+    def run(self):
+        failures = 0
+        while True:
+            try:
+                text, count = self.take_batch()
+                wait = self.post(text)
+            except Exception:
+                # Ein unerwarteter Fehler darf den Versand-Thread nicht beenden - wie ein Fehlversuch behandeln
+                logging.exception("Telegram: unerwarteter Fehler beim Senden")
+                wait = 0
+            if wait is None:
+                failures = 0
+                self.done(count)
+                continue
+            with self.condition:
+                self.sending = False
+            failures += 1
+            METRICS.inc("telegram_failures_total")
+            # retry_after der API hat Vorrang, sonst exponentiell mit Jitter
+            delay = wait or min(TELEGRAM_MAX_BACKOFF, 2 ** failures) * random.uniform(0.5, 1.0)
+            time.sleep(delay)
+
+    def flush(self, timeout=10):
+        """Beim Beenden kurz auf ausstehende Nachrichten warten, der Rest bleibt in der Warteschlange"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            # Beim Beenden nicht mehr auf weitere Nachrichten für den Digest warten
+            self.draining = True
+            self.condition.notify_all()
+            while (self.pending or self.sending) and self.thread is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.warning(f"Telegram: {len(self.pending)} Nachricht(en) bleiben für den nächsten Start in der Warteschlange.")
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+
+NOTIFIER = TelegramNotifier(TELEGRAM_URL, CHAT_ID, TELEGRAM_QUEUE_FILE, TELEGRAM_BATCH_SECONDS)
+
+
+def send_telegram_message(message):
+    if TELEGRAM == "1":
+        NOTIFIER.send(message)
+        return True
     else:
         print("Keine Telegram Notify erwünscht")
 
@@ -196,41 +776,121 @@ def compare_versions(local, remote):
     def to_tuple(v): return tuple(map(int, v.strip().split(".")))
     return to_tuple(remote) > to_tuple(local)
 
-# Funktion, die auf Updates prüft
-def check_for_update():
-    if AUTO_UPDATE == "1":
-        try:
-            logging.info("🔍 Prüfe auf Updates...")
+# Update-Prüfung: gedrosselt, mit ETag und im Hintergrund - der Neustart passiert erst zwischen zwei Durchläufen
+UPDATE_STATE_FILE = os.path.join(DATA_DIR, "update_state.json")
+UPDATE_TIMEOUT = (5, 30)
+UPDATE_READY = threading.Event()
 
-            response = requests.get(REMOTE_VERSION_URL)
-            if response.status_code != 200:
-                print(f"⚠️  Konnte Versionsinfo nicht abrufen, Statuscode: {response.status_code}")
-                return
 
+def load_update_state():
+    return read_json(UPDATE_STATE_FILE, {})
+
+
+def save_update_state(state):
+    try:
+        write_json(UPDATE_STATE_FILE, state)
+    except Exception as e:
+        logging.warning(f"Konnte Update-Status nicht speichern: {e}")
+
+
+def stage_update(remote_version):
+    """Neue Version herunterladen, prüfen und atomar an die Stelle des Skripts setzen"""
+    import requests
+    update = requests.get(REMOTE_SCRIPT_URL, timeout=UPDATE_TIMEOUT)
+    if update.status_code != 200:
+        logging.info(f"❌ Fehler beim Herunterladen der neuen Version, Statuscode: {update.status_code}")
+        return False
+
+    logging.info("✅ Update wird heruntergeladen...")
+    script_path = os.path.realpath(sys.argv[0])
+    try:
+        compile(update.content, script_path, "exec")
+    except SyntaxError as e:
+        logging.error(f"❌ Heruntergeladenes Skript ist fehlerhaft, Update verworfen: {e}")
+        return False
+    if f'VERSION = "{remote_version}"'.encode("utf-8") not in update.content:
+        logging.error(f"❌ Heruntergeladenes Skript ist nicht Version {remote_version}, Update verworfen.")
+        return False
+
+    # In eine Datei im selben Verzeichnis schreiben und dann ersetzen - nie ein halb geschriebenes Skript
+    tmp_path = script_path + ".new"
+    with open(tmp_path, "wb") as f:
+        f.write(update.content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(tmp_path, os.stat(script_path).st_mode)
+    os.replace(tmp_path, script_path)
+    return True
+
+
+def check_for_update(force=False):
+    """Prüft höchstens alle UPDATE_CHECK_HOURS Stunden auf eine neue Version und legt sie bereit"""
+    if AUTO_UPDATE != "1":
+        return False
+
+    state = load_update_state()
+    if not force and time.time() - state.get("checked_at", 0) < UPDATE_CHECK_HOURS * 3600:
+        return False
+
+    try:
+        import requests
+        logging.info("🔍 Prüfe auf Updates...")
+        headers = {"If-None-Match": state["etag"]} if state.get("etag") else {}
+        response = requests.get(REMOTE_VERSION_URL, headers=headers, timeout=UPDATE_TIMEOUT)
+        state["checked_at"] = time.time()
+
+        if response.status_code == 304 and state.get("remote_version"):
+            remote_version = state["remote_version"]
+        elif response.status_code == 200:
             remote_version = response.text.strip()
-            logging.info(f"🔍 Lokale Version: {VERSION} | Remote Version: {remote_version}")
+            state["remote_version"] = remote_version
+            state["etag"] = response.headers.get("ETag")
+        else:
+            logging.warning(f"⚠️  Konnte Versionsinfo nicht abrufen, Statuscode: {response.status_code}")
+            save_update_state(state)
+            return False
+        save_update_state(state)
+
+        logging.info(f"🔍 Lokale Version: {VERSION} | Remote Version: {remote_version}")
+        if not compare_versions(VERSION, remote_version):
+            logging.info("✅ Du verwendest die neueste Version.")
+            return False
+
+        logging.info(f"🚀 Neue Version verfügbar: {remote_version} (aktuell: {VERSION})")
+        if stage_update(remote_version):
+            logging.info("✅ Update bereitgelegt - Neustart nach dem aktuellen Durchlauf.")
+            UPDATE_READY.set()
+            return True
+    except Exception as e:
+        logging.info(f"❌ Fehler beim Update-Check: {e}")
+    return False
 
-            if compare_versions(VERSION, remote_version):
-                logging.info(f"🚀 Neue Version verfügbar: {remote_version} (aktuell: {VERSION})")
-                update = requests.get(REMOTE_SCRIPT_URL)
-                if update.status_code == 200:
-                    logging.info("✅ Update wird heruntergeladen...")
-                    script_path = os.path.realpath(sys.argv[0])
-                    with open(script_path, 'w', encoding='utf-8') as f:
-                        f.write(update.text)
-                    logging.info("✅ Update erfolgreich! Starte neu...")
 
-                    # Universeller Neustart - funktioniert mit venv & system-python
-                    os.execv(sys.executable, [sys.executable] + sys.argv)
+def update_checker():
+    while not UPDATE_READY.is_set():
+        check_for_update()
+        state = load_update_state()
+        next_check = state.get("checked_at", 0) + UPDATE_CHECK_HOURS * 3600 - time.time()
+        time.sleep(max(60, next_check))
 
-                else:
-                    logging.info(f"❌ Fehler beim Herunterladen der neuen Version, Statuscode: {update.status_code}")
-            else:
-                logging.info("✅ Du verwendest die neueste Version.")
-        except Exception as e:
-            logging.info(f"❌ Fehler beim Update-Check: {e}")
-    else:
+
+def start_update_checker():
+    if AUTO_UPDATE != "1":
         logging.info(f"Kein AutoUpdate erwünscht.")
+        return
+    threading.Thread(target=update_checker, name="update-check", daemon=True).start()
+
+
+def restart_if_updated():
+    """Nach einem bereitgelegten Update sauber neu starten"""
+    if not UPDATE_READY.is_set():
+        return
+    logging.info("✅ Update erfolgreich! Starte neu...")
+    SESSION.close()
+    NOTIFIER.flush(5)
+
+    # Universeller Neustart - funktioniert mit venv & system-python
+    os.execv(sys.executable, [sys.executable] + sys.argv)
 
 def wait_and_click(page, selector, timeout=5000, retries=5):
     for attempt in range(retries):
@@ -245,121 +905,576 @@ def wait_and_click(page, selector, timeout=5000, retries=5):
     logging.error(f"Konnte {selector} nicht klicken.")
     return False
 
-def handle_cookie_banner(page):
+# Cookie-Consent: einmal ablehnen, in der Storage-State-Datei merken, danach nichts mehr tun
+CONSENT_DENY_SELECTOR = 'button[data-testid="uc-deny-all-button"]'
+CONSENT_DENY_KEYWORDS = ["verweigern", "ablehnen", "decline"]
+CONSENT_STORAGE_KEYS = ("uc_settings", "ucData", "uc_user_interaction", "uc_consent")
+# Kontexte, in denen der Consent bereits erledigt ist
+CONSENTED = weakref.WeakSet()
+# So lange wird nach dem Klick gewartet, bis der Banner die Entscheidung im Storage abgelegt hat
+CONSENT_SAVE_TIMEOUT = 2
+
+DISMISS_CONSENT_JS = """
+(keywords) => {
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && window.getComputedStyle(el).visibility !== "hidden";
+    };
+    const roots = [document];
+    const ucRoot = document.querySelector("#usercentrics-root");
+    if (ucRoot && ucRoot.shadowRoot) {
+        roots.push(ucRoot.shadowRoot);
+    }
+    for (const root of roots) {
+        let button = root.querySelector('button[data-testid="uc-deny-all-button"]');
+        if (!button || !visible(button)) {
+            button = Array.from(root.querySelectorAll("button")).find(
+                (b) => visible(b) && keywords.some((k) => (b.textContent || "").toLowerCase().includes(k))
+            );
+        }
+        if (button) {
+            button.click();
+            return (button.textContent || "").trim() || "deny";
+        }
+    }
+    return null;
+}
+"""
+
+
+def storage_has_consent(storage_file):
+    """Prüft, ob eine gespeicherte Storage-State-Datei bereits eine Consent-Entscheidung enthält"""
+    return state_has_consent(read_json(storage_file, {}))
+
+
+def state_has_consent(state):
+    names = [c.get("name", "") for c in state.get("cookies", [])]
+    for origin in state.get("origins", []):
+        names += [item.get("name", "") for item in origin.get("localStorage", [])]
+    return any(name in CONSENT_STORAGE_KEYS for name in names)
+
+
+def install_consent_handler(page):
+    """Schließt den Banner automatisch, falls er später doch eine Aktion blockiert"""
+    if not hasattr(page, "add_locator_handler"):
+        return
+
+    def dismiss(locator=None):
+        page.locator(CONSENT_DENY_SELECTOR).click()
+        CONSENTED.add(page.context)
+        logging.info("Cookie-Banner im Hintergrund geschlossen.")
+
     try:
-        deny_selector = 'button[data-testid="uc-deny-all-button"]'
-        try:
-            button = page.query_selector(deny_selector)
-            if button and button.is_visible():
-                logging.info("Achtung Krümelmonster")
-                button.click()
-                time.sleep(1)
-                if not button.is_visible():
-                    logging.info("Cookie geschlossen (Banner verschwunden).")
-                else:
-                    logging.warning("Geklickt, aber Button scheint noch da zu sein.")
-                return
-        except Exception:
-            logging.info("Keine Arme, keine Kekse.")
+        page.add_locator_handler(page.locator(CONSENT_DENY_SELECTOR), dismiss)
+    except Exception as e:
+        logging.warning(f"Consent-Handler konnte nicht registriert werden: {e}")
 
-        deny_keywords = ["Verweigern", "Ablehnen", "Decline"]
-        buttons = page.query_selector_all("button")
 
-        for button in buttons:
-            try:
-                text = button.text_content().strip().lower()
-                if any(keyword.lower() in text for keyword in deny_keywords):
-                    if button.is_visible():
-                        logging.info(f" Cookie Text gefunden: '{text}'")
-                        try:
-                            button.click()
-                            time.sleep(1)
-                            if not button.is_visible():
-                                logging.info("Cookie geschlossen (Banner verschwunden).")
-                            else:
-                                logging.warning("Geklickt, aber Button scheint noch da zu sein.")
-                        except Exception as click_error:
-                            logging.warning(f"Cookie konnte nicht geschlossen werden: {click_error}")
-                        return
-            except Exception:
-                continue
+def save_consent(page, cookie_file, timeout=CONSENT_SAVE_TIMEOUT):
+    """Sichert den Storage-State, sobald der Banner die Entscheidung gespeichert hat - der Klick allein reicht nicht"""
+    deadline = time.monotonic() + timeout
+    while True:
+        state = page.context.storage_state()
+        if state_has_consent(state):
+            write_json(cookie_file, state)
+            return True
+        if time.monotonic() >= deadline:
+            logging.info("Consent noch nicht gespeichert - wird mit den Cookies nach dem Login gesichert.")
+            return False
+        page.wait_for_timeout(100)
+
 
-        logging.info("Nom Nom Nom")
+def handle_cookie_banner(page, cookie_file=None):
+    """cookie_file gehört zum Kontext der Seite - ohne wird die Entscheidung nicht gesichert (z. B. Absicherungs-Check)"""
+    if page.context in CONSENTED:
+        return
+    try:
+        clicked = page.evaluate(DISMISS_CONSENT_JS, CONSENT_DENY_KEYWORDS)
+        if clicked:
+            logging.info(f"Achtung Krümelmonster - Cookie abgelehnt über '{clicked}'.")
+            CONSENTED.add(page.context)
+            # Entscheidung sichern, damit der Banner beim nächsten Kontext gar nicht erst kommt
+            if cookie_file:
+                save_consent(page, cookie_file)
+        else:
+            logging.info("Nom Nom Nom")
     except Exception as e:
         logging.warning(f"Fehler im handle_cookie_banner:  {e}")
 
-def goto_and_handle_cookies(page, url, wait_until="domcontentloaded", sleep_after=0):
-    page.goto(url, wait_until=wait_until)
+def goto_and_handle_cookies(page, url, wait_until="domcontentloaded", sleep_after=0, phase="goto", cookie_file=None):
+    with timed_step(f"{url} geladen", phase):
+        response = page.goto(url, wait_until=wait_until)
+    if response is not None and response.status >= 500:
+        raise PortalError("portal_down", f"{url} antwortet mit Statuscode {response.status}")
     if sleep_after:
         time.sleep(sleep_after)
-    handle_cookie_banner(page)
+    with timed_step("Cookie-Banner", "cookie_banner"):
+        handle_cookie_banner(page, cookie_file)
 
-def wait_and_handle_cookies(page, state="domcontentloaded", sleep_after=0):
+def wait_and_handle_cookies(page, state="domcontentloaded", sleep_after=0, cookie_file=None):
     page.wait_for_load_state(state)
     if sleep_after:
         time.sleep(sleep_after)
-    handle_cookie_banner(page)
+    handle_cookie_banner(page, cookie_file)
+
+
+# Metriken: Dauer pro Phase, Ressourcen des Browsers, Wiederholungen und letzter GB-Wert
+PHASE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class Metrics:
+    """Sammelt Laufzeit-Metriken und liefert sie im Prometheus-Textformat"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, phase, seconds):
+        with self.lock:
+            hist = self.histograms.setdefault(phase, {"buckets": [0] * len(PHASE_BUCKETS), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(PHASE_BUCKETS):
+                if seconds <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += seconds
+            hist["count"] += 1
+        # Zusätzlich dem laufenden Durchlauf zuordnen (für die Historie)
+        phases = RUN_PHASES.get()
+        if phases is not None:
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def record_browser_resources(self):
+        """Speicher und CPU-Zeit aller Kindprozesse (Playwright-Treiber und Browser).
+        Gibt den anteiligen Speicher (PSS, sonst USS) zurück - die RSS-Summe zählt die
+        zwischen den Chromium-Prozessen geteilten Seiten mehrfach."""
+        psutil = load_psutil()
+        rss = 0
+        used = 0
+        cpu = 0.0
+        try:
+            for child in psutil.Process().children(recursive=True):
+                try:
+                    memory = child.memory_info()
+                    rss += memory.rss
+                    try:
+                        full = child.memory_full_info()
+                        used += getattr(full, "pss", None) or full.uss
+                    except (psutil.AccessDenied, AttributeError):
+                        used += memory.rss
+                    times = child.cpu_times()
+                    cpu += times.user + times.system
+                except psutil.Error:
+                    continue
+        except psutil.Error as e:
+            logging.warning(f"Konnte Browser-Ressourcen nicht messen: {e}")
+            return
+        self.set_gauge("browser_rss_bytes", rss)
+        self.set_gauge("browser_pss_bytes", used)
+        self.set_gauge("browser_cpu_seconds", cpu)
+        return used
+
+    def render(self):
+        def fmt_labels(labels):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        lines = []
+        with self.lock:
+            lines.append("# TYPE at_extender_phase_duration_seconds histogram")
+            for phase, hist in sorted(self.histograms.items()):
+                for bound, count in zip(PHASE_BUCKETS, hist["buckets"]):
+                    lines.append(f'at_extender_phase_duration_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+                lines.append(f'at_extender_phase_duration_seconds_bucket{{phase="{phase}",le="+Inf"}} {hist["count"]}')
+                lines.append(f'at_extender_phase_duration_seconds_sum{{phase="{phase}"}} {hist["sum"]:.6f}')
+                lines.append(f'at_extender_phase_duration_seconds_count{{phase="{phase}"}} {hist["count"]}')
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"at_extender_{name}{fmt_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f"at_extender_{name}{fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def make_metrics_handler():
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = METRICS.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
 
+        def log_message(self, format, *args):
+            pass
 
-def get_datenvolumen(page):
-    logging.info("Lese Datenvolumen aus...")
+    return MetricsHandler
 
-    try:
-        label_selectors = [
-            'one-stack.usage-meter:nth-child(1) > one-usage-meter:nth-child(1) > one-button:nth-child(2)',
-            'one-stack.usage-meter:nth-child(1) > one-stack:nth-child(1) > one-usage-meter:nth-child(1) > one-button:nth-child(2)'
-        ]
 
-        label_text = ""
-        is_community_plus = False
+def start_metrics_server(port):
+    import http.server
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", port), make_metrics_handler())
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"📈 Metriken unter http://0.0.0.0:{port}/metrics")
+    return server
 
-        for sel in label_selectors:
-            try:
-                element = page.query_selector(sel)
-                if element:
-                    label_text = element.text_content().strip()
-                    if label_text:
-                        break
-            except Exception as e:
-                logging.warning(f"Selector {sel} für Community+ Label nicht gefunden: {e}")
-
-        if "Inland & EU" in label_text:
-            is_community_plus = True
-            logging.info("Community+ erkannt")
-            GB_selectors = [
-                'one-stack.usage-meter:nth-child(2) > one-usage-meter:nth-child(1) > one-group:nth-child(1) > one-heading:nth-child(2)',
-                'one-stack.usage-meter:nth-child(2) > one-stack:nth-child(1) > one-usage-meter:nth-child(1) > one-group:nth-child(1) > one-heading:nth-child(2)'
-            ]
-        else:
-            logging.info("Kein Community+ erkannt")
-            GB_selectors = [
-                'one-stack.usage-meter:nth-child(1) > one-usage-meter:nth-child(1) > one-group:nth-child(1) > one-heading:nth-child(2)',
-                'one-stack.usage-meter:nth-child(1) > one-stack:nth-child(1) > one-usage-meter:nth-child(1) > one-group:nth-child(1) > one-heading:nth-child(2)'
-            ]
-    except Exception as e:
-        logging.warning(f"Fehler bei der Erkennung von Community+: {e}")
-        is_community_plus = False  # Fallback
-        GB_selectors = [
-            'one-stack.usage-meter:nth-child(1) > one-usage-meter:nth-child(1) > one-group:nth-child(1) > one-heading:nth-child(2)',
-            'one-stack.usage-meter:nth-child(1) > one-stack:nth-child(1) > one-usage-meter:nth-child(1) > one-group:nth-child(1) > one-heading:nth-child(2)'
-        ]
+
+# Verlauf: eine Zeile pro Durchlauf und Konto in SQLite
+HISTORY_FILE = os.path.join(DATA_DIR, "history.db")
+COMPACT_EVERY = 100
+RUN_PHASES = contextvars.ContextVar("run_phases", default=None)
+# Ergebnis des letzten Durchlaufs pro Konto (für den Exit-Code von --once)
+RUN_RESULTS = {}
 
 
-    GB_text_raw = None
-    for sel in GB_selectors:
+def percentile(values, q):
+    """Nearest-rank Perzentil, None bei leerer Liste"""
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+class HistoryStore:
+    """Append-only Verlauf mit Downsampling alter Zeilen und kleinen Auswertungen"""
+
+    def __init__(self, path, raw_days=14, max_rows=50000):
+        self.path = path
+        self.raw_days = raw_days
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.conn = None
+        self.inserts = 0
+
+    def connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                account TEXT NOT NULL,
+                gb REAL,
+                community_plus INTEGER,
+                topup INTEGER NOT NULL DEFAULT 0,
+                source TEXT,
+                attempts INTEGER,
+                duration REAL,
+                phases TEXT,
+                error TEXT)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS runs_account_ts ON runs (account, ts)")
+            self.conn.commit()
+        return self.conn
+
+    def record(self, account, gb=None, community_plus=None, topup=False, source="browser",
+               attempts=1, duration=None, phases=None, error=None, ts=None):
         try:
-            element = page.query_selector(sel)
-            if element:
-                GB_text_raw = element.text_content()
-                if GB_text_raw:
-                    break
+            with self.lock:
+                conn = self.connect()
+                conn.execute(
+                    "INSERT INTO runs (ts, account, gb, community_plus, topup, source, attempts, duration, phases, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ts or time.time(), str(account), gb,
+                     None if community_plus is None else int(community_plus), int(topup), source, attempts,
+                     duration, json.dumps(phases, sort_keys=True) if phases else None, error))
+                conn.commit()
+                self.inserts += 1
+                if self.inserts % COMPACT_EVERY == 1:
+                    self.compact()
+        except sqlite3.Error as e:
+            logging.warning(f"Konnte Verlauf nicht speichern: {e}")
+
+    def compact(self):
+        """Alte Zeilen auf eine pro Stunde und Konto ausdünnen, Nachbuchungen und Fehler bleiben erhalten"""
+        conn = self.connect()
+        cutoff = time.time() - self.raw_days * 86400
+        conn.execute(
+            "DELETE FROM runs WHERE ts < ? AND topup = 0 AND error IS NULL AND id NOT IN ("
+            " SELECT MAX(id) FROM runs WHERE ts < ? AND topup = 0 AND error IS NULL"
+            " GROUP BY account, CAST(ts / 3600 AS INTEGER))", (cutoff, cutoff))
+        if self.max_rows:
+            conn.execute("DELETE FROM runs WHERE id IN (SELECT id FROM runs ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+                         (self.max_rows,))
+        conn.commit()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connect().execute(sql, params).fetchall()
+
+    def accounts(self):
+        return [row[0] for row in self.query("SELECT DISTINCT account FROM runs ORDER BY account")]
+
+    def readings(self, account, since=0):
+        """(Zeitstempel, GB) aller erfolgreichen Messungen eines Kontos"""
+        return self.query("SELECT ts, gb FROM runs WHERE account = ? AND ts >= ? AND gb IS NOT NULL ORDER BY ts",
+                          (str(account), since))
+
+    def rate(self, account, since=0):
+        """Mittlerer Verbrauch in GB/h, Nachbuchungen werden herausgerechnet"""
+        readings = self.readings(account, since)
+        used = hours = 0.0
+        for (t0, gb0), (t1, gb1) in zip(readings, readings[1:]):
+            if t1 > t0 and gb1 <= gb0:
+                used += gb0 - gb1
+                hours += (t1 - t0) / 3600
+        return used / hours if hours else None
+
+    def summary(self, account, since=0, quantiles=(50, 90, 99)):
+        rows = self.query("SELECT gb, topup, source, duration, phases, error FROM runs WHERE account = ? AND ts >= ?",
+                          (str(account), since))
+        durations = [r[3] for r in rows if r[3] is not None and r[5] is None]
+        phase_values = {}
+        errors = {}
+        for r in rows:
+            for phase, seconds in json.loads(r[4] or "{}").items():
+                phase_values.setdefault(phase, []).append(seconds)
+            if r[5]:
+                errors[r[5]] = errors.get(r[5], 0) + 1
+        return {
+            "account": account,
+            "runs": len(rows),
+            "failures": sum(1 for r in rows if r[5]),
+            "topups": sum(r[1] for r in rows),
+            "http_runs": sum(1 for r in rows if r[2] == "http"),
+            "rate_gb_per_hour": self.rate(account, since),
+            "duration": {f"p{q}": percentile(durations, q) for q in quantiles},
+            "phases": {phase: {f"p{q}": percentile(values, q) for q in quantiles}
+                       for phase, values in sorted(phase_values.items())},
+            "errors": errors,
+        }
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+HISTORY_STORE = HistoryStore(HISTORY_FILE, HISTORY_RAW_DAYS, HISTORY_MAX_ROWS) if HISTORY == "1" else None
+
+
+class RunRecord:
+    """Sammelt Phasen-Dauern und Ergebnis eines Durchlaufs und schreibt sie in den Verlauf"""
+
+    def __init__(self, account):
+        self.account = account
+        self.start = time.monotonic()
+        self.phases = {}
+        self.error = None
+        RUN_PHASES.set(self.phases)
+
+    def fail(self, error):
+        self.error = f"{classify_error(error)}:{type(error).__name__}"
+
+    def finish(self, gb=None, community_plus=None, topup=False, source="browser", attempts=1):
+        RUN_PHASES.set(None)
+        RUN_RESULTS[self.account] = gb is not None
+        if HISTORY_STORE is None:
+            return
+        # Ein erfolgreicher Durchlauf zählt nicht als Fehler, auch wenn ein Versuch davor scheiterte
+        error = self.error if gb is None else None
+        HISTORY_STORE.record(self.account, gb, community_plus, topup, source, attempts,
+                             time.monotonic() - self.start, self.phases, error)
+
+
+def print_history(account=None, days=7):
+    """Kurze Auswertung des Verlaufs für die Kommandozeile"""
+    if HISTORY_STORE is None or not os.path.exists(HISTORY_FILE):
+        print("Kein Verlauf vorhanden.")
+        return
+    since = time.time() - days * 86400
+    for name in ([account] if account else HISTORY_STORE.accounts()):
+        s = HISTORY_STORE.summary(name, since)
+        rate = f"{s['rate_gb_per_hour']:.3f} GB/h" if s["rate_gb_per_hour"] is not None else "-"
+        print(f"{name}: {s['runs']} Durchläufe ({s['http_runs']} per HTTP), {s['failures']} Fehler, "
+              f"{s['topups']} Nachbuchungen, Verbrauch {rate}")
+        for label, values in [("Durchlauf", s["duration"])] + list(s["phases"].items()):
+            print(f"  {label:<20} " + "  ".join(f"{q}={v:.2f}s" if v is not None else f"{q}=-" for q, v in values.items()))
+        for error, count in sorted(s["errors"].items()):
+            print(f"  Fehler {error}: {count}x")
+
+
+# Profiling: Trace und DOM nur bei langsamen oder fehlgeschlagenen Durchläufen aufheben
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+PROFILE_SPANS = contextvars.ContextVar("profile_spans", default=None)
+
+
+def prune_profiles(keep, max_mb):
+    """Behält die neuesten Profile, höchstens keep Stück und max_mb MB"""
+    try:
+        names = sorted(os.listdir(PROFILE_DIR), reverse=True)
+    except OSError:
+        return
+    total = 0
+    for i, name in enumerate(names):
+        path = os.path.join(PROFILE_DIR, name)
+        size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+        total += size
+        if i >= keep or (i > 0 and total > max_mb * 1024 * 1024):
+            shutil.rmtree(path, ignore_errors=True)
+            logging.info(f"Altes Profil gelöscht: {name}")
+
+
+class RunProfiler:
+    """Zeichnet einen Durchlauf auf und behält die Artefakte nur, wenn er langsam war oder scheiterte"""
+
+    def __init__(self, account, threshold=PROFILE_THRESHOLD, keep=PROFILE_KEEP, max_mb=PROFILE_MAX_MB):
+        self.account = account
+        self.threshold = threshold
+        self.keep = keep
+        self.max_mb = max_mb
+        self.enabled = PROFILE == "1"
+        self.start = time.monotonic()
+        self.spans = []
+        self.context = None
+        self.saved = 0
+        if self.enabled:
+            PROFILE_SPANS.set(self.spans)
+
+    def attach(self, context):
+        """Startet den Trace für diesen Versuch - ohne Screenshots, die DOM-Snapshots reichen und sind billiger"""
+        if not self.enabled:
+            return
+        try:
+            context.tracing.start(snapshots=True, screenshots=False)
+            self.context = context
         except Exception as e:
-            logging.warning(f"Selector {sel} nicht verfügbar: {e}")
-            continue
+            logging.warning(f"Konnte Trace nicht starten: {e}")
+
+    def finish(self, page=None, error=None):
+        """Beendet den Trace und liefert den Ordner mit den Artefakten - None, wenn nichts aufgehoben wurde"""
+        if not self.enabled:
+            return None
+        duration = time.monotonic() - self.start
+        keep = error is not None or duration >= self.threshold
+        context, self.context = self.context, None
+        target = None
+        if keep:
+            self.saved += 1
+            reason = "error" if error is not None else "slow"
+            target = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.account}-{reason}-{self.saved}")
+            os.makedirs(target, exist_ok=True)
+        if context is not None:
+            try:
+                # Ohne Pfad wird der Trace verworfen
+                context.tracing.stop(path=os.path.join(target, "trace.zip") if target else None)
+            except Exception as e:
+                logging.warning(f"Konnte Trace nicht beenden: {e}")
+        if not target:
+            return None
 
-    if not GB_text_raw:
-        raise Exception("Konnte das Datenvolumen nicht auslesen - kein gültiger Selector gefunden.")
+        url = None
+        if page is not None:
+            try:
+                url = page.url
+                with open(os.path.join(target, "dom.html"), "w", encoding="utf-8") as f:
+                    f.write(page.content())
+            except Exception as e:
+                logging.warning(f"Konnte DOM nicht sichern: {e}")
+        write_json(os.path.join(target, "profile.json"), {
+            "account": self.account,
+            "seconds": round(duration, 3),
+            "threshold": self.threshold,
+            "error": f"{classify_error(error)}: {error}" if error is not None else None,
+            "url": url,
+            "spans": [dict(span, start=round(span["start"] - self.start, 3)) for span in self.spans],
+        })
+        logging.info(f"🔬 Profil gespeichert ({duration:.2f}s, {reason}): {target}")
+        METRICS.inc("profiles_saved_total", reason=reason)
+        prune_profiles(self.keep, self.max_mb)
+        return target
+
+
+# Bereitschaftssignale statt fester Wartezeiten
+HEADING_SELECTOR = 'one-heading[level="h1"]'
+
+@contextlib.contextmanager
+def timed_step(name, phase=None):
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        duration = time.monotonic() - start
+        logging.info(f"⏱ {name}: {duration:.2f}s")
+        if phase:
+            METRICS.observe(phase, duration)
+        spans = PROFILE_SPANS.get()
+        if spans is not None:
+            spans.append({"name": name, "phase": phase, "start": start, "seconds": round(duration, 3)})
+
+def on_login_page(page):
+    return "login" in page.url
+
+def on_dashboard(page):
+    if on_login_page(page):
+        return False
+    try:
+        return page.query_selector(HEADING_SELECTOR) is not None
+    except Exception:
+        # Während einer Navigation kann der Ausführungskontext kurz weg sein
+        return False
+
+def wait_for_ready(page, name, signals, timeout=None):
+    """Wartet bis eines der Signale eintritt und liefert dessen Namen, None bei Timeout"""
+    timeout = timeout or READY_TIMEOUT
+    start = time.monotonic()
+    while True:
+        for signal, check in signals.items():
+            if check(page):
+                logging.info(f"⏱ {name}: '{signal}' nach {time.monotonic() - start:.2f}s")
+                return signal
+        if time.monotonic() - start >= timeout:
+            logging.warning(f"⏱ {name}: kein Signal nach {timeout:.0f}s")
+            return None
+        hedge_checkpoint()
+        page.wait_for_timeout(READY_POLL_MS)
+
+def fill_credentials(page, rufnummer, passwort):
+    # Zeichenweises Tippen nur wenn TYPE_DELAY gesetzt ist, sonst direkt befüllen
+    if TYPE_DELAY:
+        page.type('#input-5', rufnummer, delay=TYPE_DELAY)
+        page.type('#input-6', passwort, delay=TYPE_DELAY)
+    else:
+        page.fill('#input-5', rufnummer)
+        page.fill('#input-6', passwort)
+
+
+def usage_meter_selectors(stack, suffix):
+    # Das Portal verschachtelt den Usage-Meter je nach Tarif in einen zusätzlichen one-stack
+    return [
+        f'one-stack.usage-meter:nth-child({stack}) > one-usage-meter:nth-child(1) > {suffix}',
+        f'one-stack.usage-meter:nth-child({stack}) > one-stack:nth-child(1) > one-usage-meter:nth-child(1) > {suffix}'
+    ]
 
+LABEL_SELECTORS = usage_meter_selectors(1, 'one-button:nth-child(2)')
+
+def gb_selectors(is_community_plus):
+    return usage_meter_selectors(2 if is_community_plus else 1, 'one-group:nth-child(1) > one-heading:nth-child(2)')
+
+def topup_selectors(is_community_plus):
+    return usage_meter_selectors(2 if is_community_plus else 1, 'one-button:nth-child(3)')
+
+def parse_datenvolumen(GB_text_raw):
     match = re.search(r"([\d\.,]+)\s?(GB|MB)", GB_text_raw)
     if not match:
         raise ValueError(f"Unerwartetes Format beim Datenvolumen: {GB_text_raw}")
@@ -368,227 +1483,1585 @@ def get_datenvolumen(page):
     value = value.replace(",", ".")
 
     if unit == "MB":
-        GB = float(value) / 1024
+        return float(value) / 1024
+    return float(value)
+
+
+# Alle Meter, Labels und Button-Kandidaten in einem einzigen page.evaluate auslesen
+TOPUP_TEXTS = ("1 GB", "1\u00a0GB")
+SELECTOR_CACHE_FILE = os.path.join(DATA_DIR, "selector_cache.json")
+SELECTOR_CACHE = None
+
+EXTRACT_USAGE_JS = """
+(groups) => {
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== "hidden";
+    };
+    const result = {};
+    for (const [name, selectors] of Object.entries(groups)) {
+        result[name] = null;
+        for (const selector of selectors) {
+            const el = document.querySelector(selector);
+            const text = el ? (el.textContent || "").trim() : "";
+            if (text) {
+                result[name] = {selector: selector, text: text, visible: visible(el)};
+                break;
+            }
+        }
+    }
+    result.buttons = Array.from(document.querySelectorAll("one-button")).map((el, index) => (
+        {index: index, text: (el.textContent || "").trim(), visible: visible(el)}
+    ));
+    return result;
+}
+"""
+
+
+def load_selector_cache():
+    global SELECTOR_CACHE
+    if SELECTOR_CACHE is None:
+        SELECTOR_CACHE = read_json(SELECTOR_CACHE_FILE, {})
+    return SELECTOR_CACHE
+
+
+def remember_selectors(used):
+    """Merkt sich, welche Selector-Variante zuletzt gepasst hat - sie wird beim nächsten Mal zuerst probiert"""
+    cache = load_selector_cache()
+    if all(cache.get(k) == v for k, v in used.items()):
+        return
+    cache.update(used)
+    try:
+        write_json(SELECTOR_CACHE_FILE, cache)
+    except OSError as e:
+        logging.warning(f"Konnte Selector-Cache nicht speichern: {e}")
+
+
+def selector_groups():
+    cache = load_selector_cache()
+
+    def prefer(name, selectors):
+        cached = cache.get(name)
+        if cached in selectors:
+            return [cached] + [s for s in selectors if s != cached]
+        return selectors
+
+    return {
+        "label": prefer("label", LABEL_SELECTORS),
+        "gb_normal": prefer("gb_normal", gb_selectors(False)),
+        "gb_community": prefer("gb_community", gb_selectors(True)),
+        "topup_normal": prefer("topup_normal", topup_selectors(False)),
+        "topup_community": prefer("topup_community", topup_selectors(True))
+    }
+
+
+def interpret_extraction(result):
+    label_text = (result.get("label") or {}).get("text", "")
+    is_community_plus = "Inland & EU" in label_text
+    if is_community_plus:
+        logging.info("Community+ erkannt")
     else:
-        GB = float(value)
+        logging.info("Kein Community+ erkannt")
+
+    gb_key = "gb_community" if is_community_plus else "gb_normal"
+    entry = result.get(gb_key)
+    if not entry:
+        raise Exception("Konnte das Datenvolumen nicht auslesen - kein gültiger Selector gefunden.")
 
+    GB = parse_datenvolumen(entry["text"])
+    used = {gb_key: entry["selector"]}
+    if label_text:
+        used["label"] = result["label"]["selector"]
+    remember_selectors(used)
     return GB, is_community_plus
 
 
+def find_topup_target(result, is_community_plus):
+    """Liefert (Selector, None) für den bekannten Button oder (None, Index) aus dem one-button Fallback"""
+    topup_key = "topup_community" if is_community_plus else "topup_normal"
+    entry = result.get(topup_key)
+    if entry and entry["visible"] and any(t in entry["text"] for t in TOPUP_TEXTS):
+        return entry["selector"], None
+    for button in result.get("buttons", []):
+        logging.debug(f"Button-Text beim Durchlauf: {button['text']}")
+        if button["visible"] and any(t in button["text"] for t in TOPUP_TEXTS):
+            return None, button["index"]
+    return None, None
 
-def login_and_check_data():
-    global LAST_GB
-    with sync_playwright() as p:
-        for attempt in range(3):  # 3 Versuche, falls Playwright abstürzt
+
+def get_datenvolumen(page):
+    logging.info("Lese Datenvolumen aus...")
+    return interpret_extraction(page.evaluate(EXTRACT_USAGE_JS, selector_groups()))
+
+
+# HTTP-Schnellpfad: Datenvolumen ohne Browser über das Portal-Backend lesen
+USAGE_REMAINING_KEYS = ("remaining", "remainingValue", "remainingVolume", "available", "left")
+USAGE_TOTAL_KEYS = ("total", "totalValue", "initial", "initialValue", "max")
+USAGE_LABEL_KEYS = ("label", "name", "title")
+USAGE_API_URL_FILE = os.path.join(DATA_DIR, "usage_api_url.txt")
+HTTP_SESSIONS = {}
+
+
+class SessionRejected(Exception):
+    pass
+
+
+def volume_to_gb(value, unit=None):
+    if isinstance(value, dict):
+        return volume_to_gb(value.get("value", value.get("amount")), value.get("unit", unit))
+    if isinstance(value, str):
+        try:
+            return parse_datenvolumen(value)
+        except ValueError:
             try:
-                COOKIE_FILE = os.path.join(DATA_DIR, "cookies.json")
-                logging.info(f"Starte {BROWSER}...")
-                LAUNCH_ARGS = get_launch_args(BROWSER)
+                value = float(value.replace(",", "."))
+            except ValueError:
+                return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    unit = (unit or "GB").upper()
+    if unit == "MB":
+        return value / 1024
+    if unit == "KB":
+        return value / 1024 / 1024
+    return float(value)
+
+
+def has_volume_unit(value, unit=None):
+    """Nur Werte mit Einheit (GB/MB) gelten als Datenvolumen - ein nacktes {"left": 0} nicht"""
+    if isinstance(value, dict):
+        unit = value.get("unit", unit)
+    elif isinstance(value, str):
+        return re.search(r"\d\s?(GB|MB)", value) is not None
+    return str(unit or "").upper() in ("GB", "MB", "KB")
+
+
+def find_usage_pools(node, pools, label=None):
+    # Sammelt alle Verbrauchs-Pools in Dokumentreihenfolge - analog zu den usage-meter Stacks im DOM
+    if isinstance(node, dict):
+        label = next((node[k] for k in USAGE_LABEL_KEYS if isinstance(node.get(k), str)), label)
+        for key in USAGE_REMAINING_KEYS:
+            if key in node and has_volume_unit(node[key], node.get("unit")):
+                remaining = volume_to_gb(node[key], node.get("unit"))
+                if remaining is not None:
+                    total = next((volume_to_gb(node[k], node.get("unit")) for k in USAGE_TOTAL_KEYS if k in node), None)
+                    pools.append({"remaining": remaining, "total": total, "label": label})
+                    return pools
+        for value in node.values():
+            find_usage_pools(value, pools, label)
+    elif isinstance(node, list):
+        for value in node:
+            find_usage_pools(value, pools, label)
+    return pools
+
+
+def find_topup_offer(node):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(value, str) and "1 GB" in value and any(k in key.lower() for k in ("offer", "label", "title", "name")):
+                return value
+            found = find_topup_offer(value)
+            if found:
+                return found
+    elif isinstance(node, list):
+        for value in node:
+            found = find_topup_offer(value)
+            if found:
+                return found
+    return None
 
-                proxy_settings = {"server": "http://127.0.0.1:8080"}
 
-                # Browser starten
-                if BROWSER == "firefox":
-                    browser = p.firefox.launch(headless=HEADLESS, args=LAUNCH_ARGS)
-                elif BROWSER == "webkit":
-                    browser = p.webkit.launch(headless=HEADLESS, args=LAUNCH_ARGS)
-                else:
-                    browser = p.chromium.launch(headless=HEADLESS, args=LAUNCH_ARGS)
+def parse_usage_payload(payload):
+    """Strukturierte Verbrauchsdaten (Pools, Community+, Nachbuch-Angebot) aus einer Backend-Antwort oder None"""
+    pools = find_usage_pools(payload, [])
+    if not pools:
+        return None
+    is_community_plus = "Inland & EU" in json.dumps(payload, ensure_ascii=False)
+    # Wie im DOM: bei Community+ ist der zweite Pool das nachbuchbare Inlandsvolumen
+    main = pools[1] if is_community_plus and len(pools) > 1 else pools[0]
+    return {
+        "remaining": main["remaining"],
+        "total": main["total"],
+        "community_plus": is_community_plus,
+        "pools": pools,
+        "offer": find_topup_offer(payload)
+    }
 
-                # Cookies vorbereiten
-                if os.path.exists(COOKIE_FILE):
-                    logging.info("Lade gespeicherte Cookies...")
-                    context = browser.new_context(user_agent=USER_AGENT, storage_state=COOKIE_FILE)
-                else:
-                    logging.info("Keine Cookies vorhanden - neuer Kontext wird erstellt.")
-                    context = browser.new_context(user_agent=USER_AGENT)
 
-                page = context.new_page()
-                stealth_sync(page)
+def extract_usage_from_json(payload):
+    """Liefert (GB, is_community_plus) aus einer Backend-Antwort oder None"""
+    usage = parse_usage_payload(payload)
+    if usage is None:
+        return None
+    return usage["remaining"], usage["community_plus"]
 
-                # Hilfsfunktion: prüfen, ob eingeloggt anhand Überschrift
-                def login_erfolgreich(p):
-                    try:
-                        p.wait_for_selector('one-heading[level="h1"]', timeout=8000)
-                        heading = p.text_content('one-heading[level="h1"]')
-                        return heading and "Übersicht" in heading
-                    except:
-                        return False
-
-                # Dashboard aufrufen
-                goto_and_handle_cookies(page, DASHBOARD_URL, sleep_after=3)
-
-                # Prüfen ob auf Login-Seite umgeleitet wurde
-                if "login" in page.url:
-                    logging.info("Nicht eingeloggt - Login wird durchgeführt...")
-                    goto_and_handle_cookies(page, LOGIN_URL)
-
-                    logging.info("Fülle Login-Daten aus...")
-                    page.type('#input-5', RUFNUMMER, delay=100)
-                    page.type('#input-6', PASSWORT, delay=120)
-
-                    if not wait_and_click(page, 'one-button[data-type="main-action"] button'):
-                        raise Exception("Login-Button konnte nicht geklickt werden.")
-
-                    logging.info("Warte auf Login...")
-                    time.sleep(15)
-
-                    if login_erfolgreich(page):
-                        logging.info("Login erfolgreich - Cookies werden gespeichert.")
-                        context.storage_state(path=COOKIE_FILE)
-                    else:
-                        raise Exception("Login fehlgeschlagen - Übersichtsseite nicht sichtbar.")
+
+def is_usage_url(url):
+    """Kommt die Antwort vom Verbrauchs-Endpunkt? Konfigurierte URL oder USAGE_URL_PATTERN"""
+    path = url.split("?", 1)[0]
+    if USAGE_API_URL and path == USAGE_API_URL.split("?", 1)[0]:
+        return True
+    return re.search(USAGE_URL_PATTERN, path, re.IGNORECASE) is not None
+
+
+def get_usage_api_url():
+    # Konfigurierte URL hat Vorrang, sonst die zuletzt im Browser mitgeschnittene
+    if USAGE_API_URL:
+        return USAGE_API_URL
+    try:
+        with open(USAGE_API_URL_FILE, "r") as f:
+            url = f.read().strip()
+    except OSError:
+        return ""
+    # Eine früher falsch gelernte URL nicht weiter abfragen
+    return url if url and is_usage_url(url) else ""
+
+
+def get_http_session(cookie_file):
+    """Gepoolte requests.Session pro Cookie-Datei, Cookies werden bei Änderung der Datei neu geladen"""
+    entry = HTTP_SESSIONS.get(cookie_file)
+    mtime = os.path.getmtime(cookie_file)
+    if entry and entry[1] == mtime:
+        return entry[0]
+
+    import requests
+    session = entry[0] if entry else requests.Session()
+    if not entry:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+
+    state = read_json(cookie_file, {})
+    session.cookies.clear()
+    for cookie in state.get("cookies", []):
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+
+    HTTP_SESSIONS[cookie_file] = (session, mtime)
+    return session
+
+
+def http_read_datenvolumen(cookie_file=None):
+    """Liest das Datenvolumen per HTTP. None, wenn der Schnellpfad nicht nutzbar ist."""
+    cookie_file = cookie_file or COOKIE_FILE
+    usage_api_url = get_usage_api_url()
+    if HTTP_FASTPATH != "1" or not usage_api_url or not os.path.exists(cookie_file):
+        return None
+
+    try:
+        session = get_http_session(cookie_file)
+        response = session.get(usage_api_url, timeout=10)
+        if response.status_code in (401, 403) or "login" in response.url:
+            raise SessionRejected(f"Statuscode {response.status_code}")
+        response.raise_for_status()
+        session_keeper(cookie_file).note_ok()
+        result = extract_usage_from_json(response.json())
+        if result is None:
+            logging.warning("HTTP-Schnellpfad: Antwort enthält kein Datenvolumen - nutze Browser.")
+        return result
+    except SessionRejected as e:
+        logging.info(f"HTTP-Schnellpfad: Session abgelehnt ({e}) - nutze Browser.")
+        session_keeper(cookie_file).note_rejected()
+    except Exception as e:
+        logging.warning(f"HTTP-Schnellpfad fehlgeschlagen: {e} - nutze Browser.")
+    return None
+
+
+# Session-Keep-alive: die Portal-Session per günstigem HTTP-Request mit den gespeicherten Cookies
+# kurz vor dem gemessenen Ablauf auffrischen, damit der teure Browser-Login selten wird
+SESSION_LIFETIME_FILE = os.path.join(DATA_DIR, "session_lifetime.json")
+DEFAULT_IDLE_TIMEOUT = 900  # Annahme, bis der erste Ablauf gemessen wurde
+MIN_KEEPALIVE_INTERVAL = 120
+SESSION_KEEPERS = {}
+SESSION_STATS = {}
+KEEPALIVE_LOCK = threading.Lock()
+KEEPALIVE_WAKE = threading.Event()
+# Gesetzt, wenn der Keep-alive neue Cookies gespeichert hat - der offene Browser-Kontext lädt sie dann neu
+COOKIES_REFRESHED = threading.Event()
+
+
+def store_http_cookies(cookie_file, session):
+    """Vom Server erneuerte Cookies in die Storage-State-Datei zurückschreiben"""
+    state = read_json(cookie_file, {})
+    cookies = {(c["name"], c.get("domain"), c.get("path", "/")): c for c in state.get("cookies", [])}
+    changed = False
+    for cookie in session.cookies:
+        key = (cookie.name, cookie.domain, cookie.path)
+        stored = cookies.get(key)
+        if stored is None:
+            stored = cookies[key] = {"name": cookie.name, "domain": cookie.domain, "path": cookie.path,
+                                     "httpOnly": False, "secure": bool(cookie.secure), "sameSite": "Lax"}
+        elif stored.get("value") == cookie.value and (cookie.expires is None or stored.get("expires") == cookie.expires):
+            continue
+        stored["value"] = cookie.value
+        stored["expires"] = cookie.expires if cookie.expires is not None else -1
+        changed = True
+    if not changed:
+        return False
+
+    state["cookies"] = list(cookies.values())
+    write_json(cookie_file, state)
+    HTTP_SESSIONS[cookie_file] = (session, os.path.getmtime(cookie_file))
+    return True
+
+
+class SessionKeeper:
+    """Misst, wie lange die Session ohne Aktivität hält, und frischt sie kurz vor dem Ablauf auf"""
+
+    def __init__(self, cookie_file, stats):
+        self.cookie_file = cookie_file
+        self.stats = stats
+        # Nur eine bekannt gültige Session wird am Leben gehalten
+        self.alive = False
+        # Gesetzt, sobald das Konto einem anderen Worker gehört - dann nichts mehr zurückschreiben
+        self.stopped = False
+
+    def idle_timeout(self):
+        failed = self.stats.get("min_failed_gap")
+        ok = self.stats.get("max_ok_gap", 0)
+        if failed and failed > ok:
+            return failed
+        return max(DEFAULT_IDLE_TIMEOUT, ok)
+
+    def next_refresh(self):
+        interval = max(MIN_KEEPALIVE_INTERVAL, self.idle_timeout() * KEEPALIVE_SAFETY)
+        return self.stats.get("last_ok", 0) + interval
+
+    def note_ok(self):
+        now = time.time()
+        with KEEPALIVE_LOCK:
+            if self.alive and self.stats.get("last_ok"):
+                gap = now - self.stats["last_ok"]
+                self.stats["max_ok_gap"] = max(self.stats.get("max_ok_gap", 0), gap)
+                failed = self.stats.get("min_failed_gap")
+                if failed and gap >= failed:
+                    # Die Session hat länger gehalten als beim letzten Ablauf - der Timeout wurde angehoben
+                    logging.info(f"Session hielt {gap:.0f}s - verwerfe alten Ablauf nach {failed:.0f}s.")
+                    del self.stats["min_failed_gap"]
+            self.stats["last_ok"] = now
+            self.alive = True
+            save_session_stats(os.path.basename(self.cookie_file), self.stats)
+        METRICS.set_gauge("session_idle_timeout_seconds", round(self.idle_timeout()), cookies=os.path.basename(self.cookie_file))
+        KEEPALIVE_WAKE.set()
+
+    def note_rejected(self):
+        now = time.time()
+        with KEEPALIVE_LOCK:
+            if self.alive and self.stats.get("last_ok"):
+                gap = now - self.stats["last_ok"]
+                if gap <= self.stats.get("max_ok_gap", 0):
+                    # Früher hielt die Session länger - der Timeout wurde gesenkt, neu lernen
+                    self.stats["max_ok_gap"] = 0
+                    self.stats["min_failed_gap"] = gap
                 else:
-                    logging.info(" Bereits eingeloggt - Zugriff aufs Dashboard funktioniert.")
+                    self.stats["min_failed_gap"] = min(self.stats.get("min_failed_gap") or gap, gap)
+                if self.stats.get("login_at"):
+                    lifetimes = self.stats.setdefault("lifetimes", [])
+                    lifetimes.append(round(now - self.stats["login_at"]))
+                    del lifetimes[:-20]
+                logging.info(f"Session nach {gap:.0f}s ohne Aktivität abgelaufen (geschätzter Timeout {self.idle_timeout():.0f}s).")
+            self.alive = False
+            save_session_stats(os.path.basename(self.cookie_file), self.stats)
+
+    def note_login(self):
+        with KEEPALIVE_LOCK:
+            self.stats["login_at"] = time.time()
+            self.stats["logins"] = self.stats.get("logins", 0) + 1
+        METRICS.inc("logins_total", cookies=os.path.basename(self.cookie_file))
+        self.note_ok()
+
+    def ping(self):
+        url = KEEPALIVE_URL or get_usage_api_url() or DASHBOARD_URL
+        if not os.path.exists(self.cookie_file):
+            self.alive = False
+            return False
+        try:
+            session = get_http_session(self.cookie_file)
+            response = session.get(url, timeout=10)
+        except Exception as e:
+            logging.warning(f"Keep-alive fehlgeschlagen: {e}")
+            METRICS.inc("keepalive_total", result="error")
+            return False
+        if self.stopped:
+            return False
+        if response.status_code in (401, 403) or "login" in response.url:
+            self.note_rejected()
+            METRICS.inc("keepalive_total", result="rejected")
+            return False
+
+        with KEEPALIVE_LOCK:
+            # Unter der Sperre prüfen, damit stop_keepalive() kein Schreiben mehr durchlässt
+            if self.stopped:
+                return False
+            try:
+                if store_http_cookies(self.cookie_file, session):
+                    COOKIES_REFRESHED.set()
+            except Exception as e:
+                logging.warning(f"Konnte erneuerte Cookies nicht speichern: {e}")
+        self.note_ok()
+        METRICS.inc("keepalive_total", result="ok")
+        logging.info(f"Keep-alive: Session aufgefrischt ({os.path.basename(self.cookie_file)}).")
+        return True
 
-                    if not login_erfolgreich(page):
-                        logging.warning("Session scheint abgelaufen oder inkonsistent - versuche erneuten Login...")
 
-                        if os.path.exists(COOKIE_FILE):
-                            os.remove(COOKIE_FILE)
-                            logging.info("Alte Cookies wurden gelöscht, da ungültig.")
+def load_session_stats():
+    return read_json(SESSION_LIFETIME_FILE, {})
 
-                        # Versuche Login erneut
-                        goto_and_handle_cookies(page, LOGIN_URL)
 
-                        logging.info("Fülle Login-Daten aus (Fallback)...")
-                        page.fill('#input-5', RUFNUMMER)
-                        page.fill('#input-6', PASSWORT)
+def save_session_stats(name, stats):
+    """Nur den Eintrag dieser Cookie-Datei zurückschreiben - im Worker-Modus teilen sich mehrere Prozesse die Datei"""
+    try:
+        with file_lock(SESSION_LIFETIME_FILE + ".update"):
+            merged = load_session_stats()
+            merged[name] = stats
+            write_json(SESSION_LIFETIME_FILE, merged)
+    except Exception as e:
+        logging.warning(f"Konnte Session-Statistik nicht speichern: {e}")
 
-                        if not wait_and_click(page, '[class="button button--solid button--medium button--color-default button--has-label"]'):
-                            raise Exception("Fallback-Login: Login-Button konnte nicht geklickt werden.")
 
-                        logging.info("Warte auf Login... (Fallback)")
-                        time.sleep(8)
+def session_keeper(cookie_file=None):
+    cookie_file = cookie_file or COOKIE_FILE
+    with KEEPALIVE_LOCK:
+        keeper = SESSION_KEEPERS.get(cookie_file)
+        if keeper is None:
+            # Frisch von der Platte - ein anderer Worker kann das Konto seit dem Start geprüft haben
+            name = os.path.basename(cookie_file)
+            stats = SESSION_STATS[name] = load_session_stats().get(name, {})
+            keeper = SESSION_KEEPERS[cookie_file] = SessionKeeper(cookie_file, stats)
+    return keeper
 
 
-                        if login_erfolgreich(page):
-                            logging.info("Fallback-Login erfolgreich neue Cookies werden gespeichert.")
-                            context.storage_state(path=COOKIE_FILE)
-                        else:
-                            raise Exception("Fallback-Login fehlgeschlagen Session kann nicht wiederhergestellt werden.")
+def keepalive_loop():
+    while True:
+        KEEPALIVE_WAKE.clear()
+        now = time.time()
+        waits = []
+        for keeper in list(SESSION_KEEPERS.values()):
+            if not keeper.alive:
+                continue
+            if keeper.next_refresh() <= now:
+                keeper.ping()
+            if keeper.alive:
+                waits.append(keeper.next_refresh() - time.time())
+        KEEPALIVE_WAKE.wait(max(1, min(waits, default=300)))
+
+
+def stop_keepalive(cookie_file):
+    """Worker-Modus: ein freigegebenes Konto nicht weiter anpingen - der neue Besitzer schreibt seine Cookies selbst"""
+    with KEEPALIVE_LOCK:
+        keeper = SESSION_KEEPERS.pop(cookie_file, None)
+        if keeper is not None:
+            keeper.stopped = True
+            keeper.alive = False
+
+
+def start_keepalive():
+    if KEEPALIVE != "1":
+        return
+    threading.Thread(target=keepalive_loop, name="keepalive", daemon=True).start()
+
+
+# Request-Filter: Bilder, Fonts, Tracker und Fremd-Skripte gar nicht erst laden
+DEFAULT_BLOCK_RESOURCE_TYPES = "image,font,media"
+DEFAULT_BLOCK_DOMAINS = "usercentrics.eu,usercentrics.com,google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,hotjar.com,adobedtm.com,omtrdc.net"
+DEFAULT_ALLOW_DOMAINS = "alditalk-kundenportal.de,alditalk-kundenbetreuung.de,alditalk.de"
+
+
+def split_list(value):
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def host_matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class RequestFilter:
+    """Blockiert Requests nach Ressourcentyp, Domain und URL-Muster und zählt, was gespart wurde"""
+
+    def __init__(self, block_types, deny_domains, allow_domains, deny_patterns):
+        self.block_types = set(block_types)
+        self.deny_domains = deny_domains
+        self.allow_domains = allow_domains
+        self.deny_patterns = [re.compile(p) for p in deny_patterns]
+        self.reset_stats()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            split_list(config.get("BLOCK_RESOURCE_TYPES") or DEFAULT_BLOCK_RESOURCE_TYPES),
+            split_list(config.get("BLOCK_DOMAINS") or DEFAULT_BLOCK_DOMAINS),
+            # Die Hosts der (ggf. überschriebenen) Portal-URLs sind immer erlaubt
+            split_list(config.get("ALLOW_DOMAINS") or DEFAULT_ALLOW_DOMAINS) + [urllib.parse.urlsplit(u).hostname for u in (LOGIN_URL, DASHBOARD_URL)],
+            split_list(config.get("BLOCK_URL_PATTERNS"))
+        )
+
+    def reset_stats(self):
+        self.stats = {"blocked": 0, "allowed": 0, "bytes": 0, "blocked_by_reason": {}}
+
+    def take_stats(self):
+        stats = self.stats
+        self.reset_stats()
+        return stats
+
+    def fork(self):
+        """Gleiche Regeln, eigene Zähler - im Multi-Account-Modus bekommt jedes Konto seine eigene Statistik"""
+        clone = copy.copy(self)
+        clone.reset_stats()
+        return clone
+
+    def block_reason(self, url, resource_type):
+        # Die Seite selbst wird nie blockiert, sonst schlägt die Navigation fehl
+        if resource_type == "document":
+            return None
+        host = urllib.parse.urlsplit(url).hostname or ""
+        if host_matches(host, self.deny_domains):
+            return "domain"
+        if any(p.search(url) for p in self.deny_patterns):
+            return "pattern"
+        if resource_type in self.block_types:
+            return resource_type
+        # Skripte fremder Domains werden nicht gebraucht, um eine Zahl zu lesen oder einen Button zu klicken
+        if resource_type == "script" and not host_matches(host, self.allow_domains):
+            return "third-party-script"
+        return None
 
-                    # Session aktiv verlängern durch Aktion:
-                    try:
-                        page.hover('one-heading[level="h1"]')
-                        logging.info("Session-Aktivität erfolgreich simuliert hover auf Überschrift.")
-                    except:
-                        logging.warning("Session konnte nicht ausgeführt werden.")
+    def count(self, route):
+        reason = self.block_reason(route.request.url, route.request.resource_type)
+        if reason:
+            self.stats["blocked"] += 1
+            self.stats["blocked_by_reason"][reason] = self.stats["blocked_by_reason"].get(reason, 0) + 1
+        else:
+            self.stats["allowed"] += 1
+        return reason
 
-                    #
-                    logging.info("Cookies werden erneuert.")
-                    context.storage_state(path=COOKIE_FILE)
+    def handle(self, route):
+        if self.count(route):
+            route.abort()
+        else:
+            route.continue_()
 
-                GB, is_community_plus = get_datenvolumen(page)
-                LAST_GB = GB
+    async def handle_async(self, route):
+        if self.count(route):
+            await route.abort()
+        else:
+            await route.continue_()
 
-                try:
-                    with open(STATE_FILE, "w") as f:
-                        json.dump({"last_gb": LAST_GB}, f)
-                except Exception as e:
-                    logging.warning(f"Fehler beim Speichern des GB-Werts: {e}")
+    def on_response(self, response):
+        try:
+            self.stats["bytes"] += int(response.headers.get("content-length") or 0)
+        except ValueError:
+            pass
+
+    def summary(self):
+        stats = self.take_stats()
+        for reason, count in stats["blocked_by_reason"].items():
+            METRICS.inc("requests_blocked_total", count, reason=reason)
+        METRICS.inc("requests_allowed_total", stats["allowed"])
+        METRICS.inc("response_bytes_total", stats["bytes"])
+        reasons = ", ".join(f"{k}: {v}" for k, v in sorted(stats["blocked_by_reason"].items())) or "-"
+        return f"Request-Filter: {stats['blocked']} Requests blockiert ({reasons}), {stats['allowed']} geladen, {stats['bytes'] / 1024:.0f} KB übertragen"
+
+
+def request_filter_enabled():
+    if REQUEST_FILTER == "auto":
+        return is_low_memory()
+    return REQUEST_FILTER == "1"
+
+
+class UsageCapture:
+    """Schneidet die JSON-Antworten des Dashboards mit und erkennt darin die Verbrauchsdaten"""
+
+    def __init__(self, page, async_api=False):
+        self.usage = None
+        self.url = None
+        self.method = None
+        page.on("response", self.on_response_async if async_api else self.on_response)
+
+    def reset(self):
+        self.usage = None
+        self.url = None
+        self.method = None
+
+    def accepts(self, response):
+        if self.usage is not None:
+            return False
+        if response.request.resource_type not in ("xhr", "fetch") or not is_usage_url(response.url):
+            return False
+        return "json" in (response.headers.get("content-type") or "")
+
+    def store(self, usage, response):
+        if usage and self.usage is None:
+            self.usage = usage
+            self.url = response.url
+            self.method = response.request.method
+
+    def on_response(self, response):
+        try:
+            if self.accepts(response):
+                self.store(parse_usage_payload(response.json()), response)
+        except Exception:
+            return
+
+    async def on_response_async(self, response):
+        try:
+            if self.accepts(response):
+                self.store(parse_usage_payload(await response.json()), response)
+        except Exception:
+            return
+
+    def wait(self, page, timeout, selector=None):
+        """Wartet bis die Verbrauchsdaten mitgeschnitten wurden, höchstens timeout Sekunden.
+        Mit selector endet das Warten auch, sobald das Element auf der Seite steht."""
+        deadline = time.monotonic() + timeout
+        while self.usage is None and time.monotonic() < deadline:
+            hedge_checkpoint()
+            if selector and page.query_selector(selector):
+                break
+            # wait_for_timeout lässt Playwright die Events (und damit on_response) abarbeiten
+            page.wait_for_timeout(100)
+        self.learn_url()
+        return self.usage
+
+    async def wait_async(self, page, timeout, selector=None):
+        deadline = time.monotonic() + timeout
+        while self.usage is None and time.monotonic() < deadline:
+            if selector and await page.query_selector(selector):
+                break
+            await page.wait_for_timeout(100)
+        self.learn_url()
+        return self.usage
+
+    def learn_url(self):
+        # Nur GET-Endpunkte lernen - die Antwort einer Nachbuchung (POST) taugt nicht für den Schnellpfad
+        if self.usage is not None and self.url and self.method == "GET" and self.url != get_usage_api_url():
+            try:
+                write_text(USAGE_API_URL_FILE, self.url)
+                logging.info(f"Verbrauchs-Endpunkt gelernt: {self.url}")
+            except OSError as e:
+                logging.warning(f"Konnte Verbrauchs-Endpunkt nicht speichern: {e}")
 
-                interval = get_interval(config)
 
-                if GB < 1.0:
-                    logging.info("Versuche, 1 GB Datenvolumen nachzubuchen...")
-
-                    if is_community_plus:
-                        selectors = [
-                            'one-stack.usage-meter:nth-child(2) > one-usage-meter:nth-child(1) > one-button:nth-child(3)',
-                            'one-stack.usage-meter:nth-child(2) > one-stack:nth-child(1) > one-usage-meter:nth-child(1) > one-button:nth-child(3)'
-                        ]
-                    else:
-                        selectors = [
-                            'one-stack.usage-meter:nth-child(1) > one-usage-meter:nth-child(1) > one-button:nth-child(3)',
-                            'one-stack.usage-meter:nth-child(1) > one-stack:nth-child(1) > one-usage-meter:nth-child(1) > one-button:nth-child(3)'
-                        ]
-
-                    clicked = False
-                    for selector in selectors:
-                        try:
-                            elements = page.query_selector_all(selector)
-                            for button in elements:
-                                if not button or not button.is_visible():
-                                    continue
-                                text = button.text_content().strip()
-                                if "1 GB" in text or "1 GB" in text:
-                                    if wait_and_click(page, selector):
-                                        logging.info(f"Nachbuchungsbutton geklickt über Selector: {selector}")
-                                        message = f"{RUFNUMMER}: Aktuelles Datenvolumen: {GB:.2f} GB – 1 GB wurde erfolgreich nachgebucht. 📲"
-                                        send_telegram_message(message)
-                                        clicked = True
-                                        break
-                            if clicked:
-                                break
-                        except Exception as e:
-                            logging.warning(f"Fehler beim klicken: {e}")
+def remote_browser_for(browser_name):
+    """Endpunkt des entfernten Browsers für diese Engine - CDP gibt es nur für Chromium"""
+    if not REMOTE_BROWSER or browser_name != BROWSER:
+        return None
+    if REMOTE_BROWSER.startswith(("http://", "https://")) and browser_name != "chromium":
+        logging.warning(f"REMOTE_BROWSER über CDP geht nur mit chromium, nicht mit {browser_name} - starte lokal.")
+        return None
+    return REMOTE_BROWSER
 
-                    if not clicked:
-                        logging.info("Button nicht gefunden, Seite wird durchsuchst...")
-                        try:
-                            all_buttons = page.query_selector_all("one-button")
-                            for btn in all_buttons:
-                                try:
-                                    if not btn or not btn.is_visible():
-                                        continue
-                                    text = btn.text_content().strip()
-                                    logging.debug(f"Button-Text beim Durchlauf: {text}")
-                                    if "1 GB" in text or "1 GB" in text:
-                                        btn.click()
-                                        logging.info("Fallback erfolgreich.")
-                                        send_telegram_message(f"{RUFNUMMER}: Über Trick17 1 GB nachgebucht. 📲")
-                                        clicked = True
-                                        break
-                                except Exception:
-                                    continue
-                        except Exception as fallback_error:
-                            logging.warning(f"Fehler bei der Fallback Suche: {fallback_error}")
-
-                    if not clicked:
-                        raise Exception("Kein gültiger 1 GB Button gefunden – auch Fallback versagte.")
 
-                else:
-                    logging.info(f"Aktuelles Datenvolumen: {GB:.2f} GB")
-                    send_telegram_message(f"{RUFNUMMER}: Noch {GB:.2f} GB übrig. Nächster Run in {interval} Sekunden. ✅")
+def connect_remote(playwright, browser_name, endpoint):
+    """Verbindet sich mit einem laufenden Browser - Playwright-Server per WebSocket oder Chromium per CDP"""
+    if endpoint.startswith(("http://", "https://")):
+        return playwright.chromium.connect_over_cdp(endpoint, timeout=READY_TIMEOUT * 1000)
+    return getattr(playwright, browser_name).connect(endpoint, timeout=READY_TIMEOUT * 1000)
+
+
+async def connect_remote_async(playwright, browser_name, endpoint):
+    if endpoint.startswith(("http://", "https://")):
+        return await playwright.chromium.connect_over_cdp(endpoint, timeout=READY_TIMEOUT * 1000)
+    return await getattr(playwright, browser_name).connect(endpoint, timeout=READY_TIMEOUT * 1000)
+
 
-                return get_interval(config)
+def remote_failed(endpoint, error):
+    """Ohne Fallback ist ein nicht erreichbarer Browser-Server ein Browser-Fehler, sonst wird lokal gestartet"""
+    METRICS.inc("remote_connect_failures_total")
+    if REMOTE_FALLBACK != "1":
+        raise PortalError("browser", f"Entfernter Browser {endpoint} nicht erreichbar: {error}")
+    logging.warning(f"Entfernter Browser {endpoint} nicht erreichbar ({error}) - starte lokal, neuer Versuch in {REMOTE_RETRY}s.")
 
 
+class BrowserSession:
+    """Hält Playwright, Browser und Kontext über mehrere Durchläufe am Leben"""
+
+    def __init__(self, browser_name, max_runs=20):
+        self.browser_name = browser_name
+        self.max_runs = max_runs
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.capture = None
+        self.request_filter = None
+        self.runs = 0
+        self.launch_time = 0.0
+        self.budget_mb = 0
+        self.remote = False
+        self.remote_retry_at = 0.0
+
+    def is_alive(self):
+        try:
+            return self.browser is not None and self.browser.is_connected()
+        except Exception:
+            return False
+
+    def launch(self):
+        start = time.monotonic()
+        if self.playwright is None:
+            load_playwright()
+            self.playwright = sync_playwright().start()
+            self.request_filter = RequestFilter.from_config(config) if request_filter_enabled() else None
+        self.budget_mb = memory_budget_mb()
+        self.runs = 0
+        if self.connect():
+            return
+        logging.info(f"Starte {self.browser_name}...")
+        engine = getattr(self.playwright, self.browser_name)
+        self.browser = engine.launch(headless=HEADLESS, **launch_options(self.browser_name, self.budget_mb))
+        self.launch_time = time.monotonic() - start
+        logging.info(f"⏱ {self.browser_name} gestartet in {self.launch_time:.2f}s")
+        METRICS.observe("browser_launch", self.launch_time)
+        METRICS.inc("browser_launches_total", browser=self.browser_name)
+
+    def connect(self):
+        """Nutzt den entfernten Browser, falls konfiguriert - pro Durchlauf entsteht dort nur ein Kontext"""
+        self.remote = False
+        endpoint = remote_browser_for(self.browser_name)
+        if not endpoint or time.monotonic() < self.remote_retry_at:
+            return False
+        start = time.monotonic()
+        try:
+            self.browser = connect_remote(self.playwright, self.browser_name, endpoint)
+        except Exception as e:
+            self.remote_retry_at = time.monotonic() + REMOTE_RETRY
+            remote_failed(endpoint, e)
+            return False
+        self.remote = True
+        self.launch_time = time.monotonic() - start
+        logging.info(f"⏱ Mit entferntem {self.browser_name} verbunden in {self.launch_time:.2f}s ({endpoint})")
+        METRICS.observe("browser_connect", self.launch_time)
+        METRICS.inc("browser_connects_total", browser=self.browser_name)
+        return True
+
+    def open_context(self, storage_state=None):
+        """storage_state: eigene Kopie des Storage-States statt der Cookie-Datei (Absicherungs-Check)"""
+        start = time.monotonic()
+        # Cookies vorbereiten
+        if storage_state is None and os.path.exists(COOKIE_FILE):
+            storage_state = COOKIE_FILE
+        if storage_state:
+            logging.info("Lade gespeicherte Cookies...")
+            self.context = self.browser.new_context(user_agent=USER_AGENT, storage_state=storage_state)
+        else:
+            logging.info("Keine Cookies vorhanden - neuer Kontext wird erstellt.")
+            self.context = self.browser.new_context(user_agent=USER_AGENT)
+
+        # Routing einmal pro Kontext einrichten
+        if self.request_filter:
+            self.context.route("**/*", self.request_filter.handle)
+            self.context.on("response", self.request_filter.on_response)
+
+        self.page = self.context.new_page()
+        stealth_sync(self.page)
+        install_consent_handler(self.page)
+        if state_has_consent(storage_state) if isinstance(storage_state, dict) else storage_has_consent(COOKIE_FILE):
+            CONSENTED.add(self.context)
+        self.capture = UsageCapture(self.page)
+        METRICS.observe("context_create", time.monotonic() - start)
+
+    def acquire(self):
+        """Liefert die wiederverwendbare Seite, startet oder recycelt den Browser bei Bedarf"""
+        if self.is_alive() and self.max_runs and self.runs >= self.max_runs:
+            logging.info(f"Browser hat {self.runs} Durchläufe hinter sich - wird recycelt.")
+            METRICS.inc("browser_recycles_total", reason="runs")
+            self.recycle()
+        elif self.is_alive() and over_memory_budget(self.budget_mb):
+            # Lieber jetzt neu starten als mitten in einer Nachbuchung vom OOM-Killer beendet werden
+            self.recycle()
+        elif (self.is_alive() and not self.remote and remote_browser_for(self.browser_name)
+              and time.monotonic() >= self.remote_retry_at):
+            logging.info("Lokaler Browser war nur Ersatz - versuche wieder den entfernten.")
+            self.recycle()
+
+        if not self.is_alive():
+            if self.browser is not None and self.remote:
+                logging.warning("Verbindung zum entfernten Browser verloren - verbinde neu.")
+                METRICS.inc("remote_disconnects_total")
+            self.recycle()
+            self.launch()
+        else:
+            logging.info(f"Verwende laufenden {self.browser_name} weiter (Durchlauf {self.runs + 1}).")
+
+        if COOKIES_REFRESHED.is_set():
+            # Der Keep-alive hat neue Cookies gespeichert - Kontext damit neu aufbauen
+            COOKIES_REFRESHED.clear()
+            self.close_context()
+
+        if self.context is None or self.page is None or self.page.is_closed():
+            self.close_context()
+            self.open_context()
+
+        self.runs += 1
+        return self.context, self.page
+
+    def close_context(self):
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception as e:
+                logging.warning(f"Fehler beim Schließen des Kontexts: {e}")
+        self.context = None
+        self.page = None
+
+    def recycle(self):
+        """Schließt Browser und Kontext, Playwright selbst bleibt bestehen"""
+        self.close_context()
+        if self.browser is not None:
+            try:
+                self.browser.close()
+                logging.info("Browser geschlossen.")
             except Exception as e:
-                logging.error(f"Fehler im Versuch {attempt+1}: {e}")
-                send_telegram_message(f"{RUFNUMMER}: ❌ Fehler beim Abrufen des Datenvolumens: {e}")
+                logging.warning(f"Fehler beim Schließen des Browsers: {e}")
+        self.browser = None
+        self.runs = 0
 
-            finally:
-                if browser:
-                    browser.close()
-                    logging.info("Browser geschlossen.")
+    def close(self):
+        self.recycle()
+        if self.playwright is not None:
+            try:
+                self.playwright.stop()
+            except Exception as e:
+                logging.warning(f"Fehler beim Beenden von Playwright: {e}")
+            self.playwright = None
+
+
+SESSION = BrowserSession(BROWSER, BROWSER_RECYCLE_RUNS)
+
+
+# Fehlerklassen, Wiederholung pro Phase und Circuit Breaker
+BREAKER_FILE = os.path.join(DATA_DIR, "circuit.json")
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+
+class PortalError(Exception):
+    """Fehler mit bekannter Klasse: network, auth, selector, portal_down oder browser"""
 
-            time.sleep(2)
-        logging.error("Skript hat nach 3 Versuchen aufgegeben.")
-        return get_interval(config)
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
 
-def get_smart_interval():
-    if LAST_GB >= 10:
+
+def classify_error(error):
+    # "auth" kommt nur aus den eigenen Login-Prüfungen - ein Timeout auf der Login-URL ist ein Netzwerkfehler
+    if isinstance(error, PortalError):
+        return error.kind
+    message = str(error).lower()
+    if any(s in message for s in ("net::err", "ns_error", "connection", "name resolution", "econn", "timed out")):
+        return "network"
+    if any(s in message for s in ("target closed", "has been closed", "crashed", "executable doesn't exist", "browser closed")):
+        return "browser"
+    if any(s in message for s in ("selector", "locator", "waiting for", "button", "usage-meter", "datenvolumen")):
+        return "selector"
+    if "timeout" in type(error).__name__.lower() or "timeout" in message:
+        return "network"
+    return "unknown"
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponentiell mit Jitter: zwischen der Hälfte und dem vollen Wert von base * 2^(attempt-1)"""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def with_retry(phase, func, retry_kinds=("network", "selector", "portal_down", "unknown"), before_retry=None, attempts=None):
+    """Führt eine Phase aus und wiederholt nur diese - Seite und Kontext bleiben erhalten"""
+    attempts = attempts or PHASE_RETRIES
+    for attempt in range(1, attempts + 1):
+        hedge_checkpoint()
+        try:
+            if attempt > 1 and before_retry:
+                before_retry()
+            return func()
+        except Exception as e:
+            kind = classify_error(e)
+            if kind not in retry_kinds or attempt == attempts:
+                raise
+            delay = backoff_delay(attempt)
+            logging.warning(f"{phase}: {kind}-Fehler im Versuch {attempt}/{attempts}: {e} - neuer Versuch in {delay:.1f}s")
+            METRICS.inc("phase_retries_total", phase=phase, kind=kind)
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """Nach mehreren Fehlschlägen in Folge: Intervalle strecken und gleiche Fehlermeldungen nur einmal senden"""
+
+    def __init__(self, path, threshold=3, max_interval=3600):
+        self.path = path
+        self.threshold = threshold
+        self.max_interval = max_interval
+
+    def load(self, account):
+        return read_json(self.path, {}).get(str(account), {"failures": 0, "notified": []})
+
+    def save(self, account, state):
+        states = read_json(self.path, {})
+        states[str(account)] = state
+        try:
+            write_json(self.path, states)
+        except OSError as e:
+            logging.warning(f"Konnte Circuit-Breaker-Status nicht speichern: {e}")
+
+    def is_open(self, account):
+        return self.load(account)["failures"] >= self.threshold
+
+    def record_failure(self, account, kind, message):
+        """Zählt den Fehlschlag und liefert die zu sendende Nachricht - None, wenn sie schon gemeldet wurde"""
+        # Eigene Sperre für Lesen+Schreiben, andere Worker teilen sich die Datei
+        with file_lock(self.path + ".update"):
+            return self.update_failure(account, kind, message)
+
+    def update_failure(self, account, kind, message):
+        state = self.load(account)
+        state["failures"] += 1
+        METRICS.set_gauge("circuit_open", int(state["failures"] >= self.threshold), account=account)
+        notify = None
+        if state["failures"] == self.threshold:
+            notify = (f"{account}: ⚠️ Portal scheint gestört ({kind}) - {state['failures']} Fehlschläge in Folge. "
+                      f"Prüfungen werden gestreckt, weitere gleiche Fehler werden nicht gemeldet.")
+        elif kind not in state["notified"]:
+            notify = f"{account}: ❌ Fehler beim Abrufen des Datenvolumens ({kind}): {message}"
+        if kind not in state["notified"]:
+            state["notified"].append(kind)
+        self.save(account, state)
+        return notify
+
+    def record_success(self, account):
+        """Setzt den Zähler zurück und liefert eine Entwarnung, falls der Breaker offen war"""
+        if not self.load(account)["failures"]:
+            return None
+        with file_lock(self.path + ".update"):
+            state = self.load(account)
+            if not state["failures"]:
+                return None
+            was_open = state["failures"] >= self.threshold
+            self.save(account, {"failures": 0, "notified": []})
+        METRICS.set_gauge("circuit_open", 0, account=account)
+        return f"{account}: ✅ Portal wieder erreichbar." if was_open else None
+
+    def interval(self, account, interval):
+        """Bei offenem Breaker wächst das Intervall exponentiell bis max_interval"""
+        failures = self.load(account)["failures"]
+        if failures < self.threshold:
+            return interval
+        base = interval or 60
+        return max(base, min(self.max_interval, base * 2 ** (failures - self.threshold + 1)))
+
+
+BREAKER = CircuitBreaker(BREAKER_FILE, BREAKER_THRESHOLD, BREAKER_MAX_INTERVAL)
+
+
+# Hilfsfunktion: prüfen, ob eingeloggt anhand Überschrift
+def login_erfolgreich(p):
+    try:
+        p.wait_for_selector(HEADING_SELECTOR, timeout=8000)
+        heading = p.text_content(HEADING_SELECTOR)
+        return heading and "Übersicht" in heading
+    except:
+        return False
+
+
+def ensure_logged_in(context, page):
+    # Prüfen ob auf Login-Seite umgeleitet wurde
+    keeper = session_keeper(COOKIE_FILE)
+    if on_login_page(page):
+        logging.info("Nicht eingeloggt - Login wird durchgeführt...")
+        keeper.note_rejected()
+        with timed_step("Login-Seite geladen"):
+            goto_and_handle_cookies(page, LOGIN_URL, cookie_file=COOKIE_FILE)
+
+        logging.info("Fülle Login-Daten aus...")
+        fill_credentials(page, RUFNUMMER, PASSWORT)
+
+        if not wait_and_click(page, 'one-button[data-type="main-action"] button'):
+            raise PortalError("selector", "Login-Button konnte nicht geklickt werden.")
+
+        logging.info("Warte auf Login...")
+        wait_for_ready(page, "Login", {"dashboard": on_dashboard})
+
+        if login_erfolgreich(page):
+            logging.info("Login erfolgreich - Cookies werden gespeichert.")
+            save_storage_state(context, COOKIE_FILE)
+            keeper.note_login()
+        else:
+            raise PortalError("auth", "Login fehlgeschlagen - Übersichtsseite nicht sichtbar.")
+    else:
+        logging.info(" Bereits eingeloggt - Zugriff aufs Dashboard funktioniert.")
+
+        if not login_erfolgreich(page):
+            logging.warning("Session scheint abgelaufen oder inkonsistent - versuche erneuten Login...")
+            keeper.note_rejected()
+
+            if os.path.exists(COOKIE_FILE):
+                os.remove(COOKIE_FILE)
+                logging.info("Alte Cookies wurden gelöscht, da ungültig.")
+            context.clear_cookies()
+
+            # Versuche Login erneut
+            goto_and_handle_cookies(page, LOGIN_URL, cookie_file=COOKIE_FILE)
+
+            logging.info("Fülle Login-Daten aus (Fallback)...")
+            fill_credentials(page, RUFNUMMER, PASSWORT)
+
+            if not wait_and_click(page, '[class="button button--solid button--medium button--color-default button--has-label"]'):
+                raise PortalError("selector", "Fallback-Login: Login-Button konnte nicht geklickt werden.")
+
+            logging.info("Warte auf Login... (Fallback)")
+            wait_for_ready(page, "Login (Fallback)", {"dashboard": on_dashboard})
+
+            if login_erfolgreich(page):
+                logging.info("Fallback-Login erfolgreich neue Cookies werden gespeichert.")
+                save_storage_state(context, COOKIE_FILE)
+                keeper.note_login()
+            else:
+                raise PortalError("auth", "Fallback-Login fehlgeschlagen Session kann nicht wiederhergestellt werden.")
+
+        # Session aktiv verlängern durch Aktion:
+        try:
+            page.hover(HEADING_SELECTOR)
+            logging.info("Session-Aktivität erfolgreich simuliert hover auf Überschrift.")
+        except:
+            logging.warning("Session konnte nicht ausgeführt werden.")
+
+        #
+        if save_storage_state(context, COOKIE_FILE):
+            logging.info("Cookies wurden erneuert.")
+        keeper.note_ok()
+
+
+def read_datenvolumen(page, capture):
+    # Wer zuerst da ist gewinnt: die Portal-Antwort oder der gerenderte Meter
+    usage = capture.wait(page, CAPTURE_TIMEOUT, USAGE_METER_SELECTOR)
+    if usage is not None:
+        GB, is_community_plus = usage["remaining"], usage["community_plus"]
+        logging.info(f"Datenvolumen aus Portal-Antwort gelesen: {GB:.2f} GB (Community+: {is_community_plus}, Angebot: {usage['offer']})")
+        return GB, is_community_plus
+
+    logging.info("Keine Verbrauchsdaten im Netzwerk gefunden - lese aus der Seite.")
+    try:
+        page.wait_for_selector(USAGE_METER_SELECTOR, timeout=10000)
+    except TimeoutError:
+        logging.warning("Usage-Meter nicht rechtzeitig gerendert.")
+    return get_datenvolumen(page)
+
+
+def book_topup(page, GB, is_community_plus):
+    logging.info("Versuche, 1 GB Datenvolumen nachzubuchen...")
+
+    result = page.evaluate(EXTRACT_USAGE_JS, selector_groups())
+    selector, index = find_topup_target(result, is_community_plus)
+
+    if selector:
+        if wait_and_click(page, selector):
+            logging.info(f"Nachbuchungsbutton geklickt über Selector: {selector}")
+            remember_selectors({"topup_community" if is_community_plus else "topup_normal": selector})
+            return f"{RUFNUMMER}: Aktuelles Datenvolumen: {GB:.2f} GB – 1 GB wurde erfolgreich nachgebucht. 📲"
+
+    if index is not None:
+        logging.info("Button nicht gefunden, Seite wird durchsuchst...")
+        try:
+            page.locator("one-button").nth(index).click()
+            logging.info("Fallback erfolgreich.")
+            return f"{RUFNUMMER}: Über Trick17 1 GB nachgebucht. 📲"
+        except Exception as fallback_error:
+            logging.warning(f"Fehler bei der Fallback Suche: {fallback_error}")
+
+    raise Exception("Kein gültiger 1 GB Button gefunden – auch Fallback versagte.")
+
+
+def read_meter_quietly(page, is_community_plus):
+    """Liest das Restvolumen aus dem Meter ohne Logging und Selector-Cache - None, wenn nichts lesbar ist"""
+    try:
+        result = page.evaluate(EXTRACT_USAGE_JS, selector_groups())
+        entry = result.get("gb_community" if is_community_plus else "gb_normal")
+        return parse_datenvolumen(entry["text"]) if entry else None
+    except Exception:
+        return None
+
+
+def confirm_topup(page, capture, before_gb, is_community_plus, timeout=None):
+    """Wartet nach dem Klick auf ein höheres Restvolumen aus der Portal-Antwort oder dem Meter - None, wenn keins kommt"""
+    deadline = time.monotonic() + (timeout or TOPUP_CONFIRM_TIMEOUT)
+    while time.monotonic() < deadline:
+        # Eine Buchung bringt 1 GB, der Verbrauch in den paar Sekunden ist vernachlässigbar
+        if capture.usage is not None and capture.usage["remaining"] > before_gb + 0.5:
+            return capture.usage["remaining"]
+        gb = read_meter_quietly(page, is_community_plus)
+        if gb is not None and gb > before_gb + 0.5:
+            return gb
+        page.wait_for_timeout(500)
+    return None
+
+
+def needs_more_topup(gb, account):
+    """Weiter nachbuchen, solange unter 1 GB oder der Verbrauch das Volumen schon vor der nächsten Prüfung aufbraucht"""
+    if gb < 1.0:
+        return True
+    if HISTORY_STORE is None:
+        return False
+    rate, _ = estimate_rate(HISTORY_STORE.readings(account, time.time() - 7 * 86400))
+    if not rate:
+        return False
+    interval = get_interval(config, gb, account)
+    return gb - rate * interval / 3600 < 1.0
+
+
+def topup_burst(page, capture, GB, is_community_plus, before_retry=None):
+    """Bucht nach, bestätigt jede Buchung im selben Kontext und bucht weiter, solange es nötig und erlaubt ist.
+    Liefert Nachricht, bestätigtes Restvolumen (None, wenn unbestätigt) und Anzahl der Buchungen."""
+    message = None
+    booked = 0
+    confirmed = None
+    while booked < TOPUP_BURST_MAX:
+        before = confirmed if confirmed is not None else GB
+        capture.reset()
+        try:
+            if booked == 0:
+                # Nur wiederholen, wenn noch nichts geklickt wurde (Button nicht gefunden)
+                message = with_retry("topup", lambda: book_topup(page, before, is_community_plus),
+                                     retry_kinds=("selector",), before_retry=before_retry)
+            else:
+                book_topup(page, before, is_community_plus)
+        except Exception as e:
+            if booked == 0:
+                raise
+            logging.info(f"Keine weitere Nachbuchung möglich: {e}")
+            break
+        booked += 1
+        METRICS.inc("topups_total")
+        with timed_step("Nachbuchung bestätigt", "topup_confirm"):
+            gb = confirm_topup(page, capture, before, is_community_plus)
+        if gb is None:
+            logging.warning("Nachbuchung nicht bestätigt - Restvolumen hat sich nicht erhöht.")
+            METRICS.inc("topups_unconfirmed_total")
+            message += " ⚠️ Noch nicht bestätigt - wird beim nächsten Durchlauf geprüft."
+            return message, confirmed, booked
+        logging.info(f"Nachbuchung bestätigt: {before:.2f} GB → {gb:.2f} GB")
+        confirmed = gb
+        if not needs_more_topup(gb, RUFNUMMER):
+            break
+        logging.info("Verbrauch ist hoch - buche im selben Durchlauf weiter nach.")
+    if confirmed is not None:
+        message += f" Bestätigt: {booked}× 1 GB, jetzt {confirmed:.2f} GB."
+    return message, confirmed, booked
+
+
+# Hedging: zweiter Check mit anderer Engine, falls der erste hängt - der erste Messwert gewinnt
+HEDGE_MIN_DELAY = 5
+ACTIVE_RACE = contextvars.ContextVar("active_race", default=None)
+
+
+class HedgeLost(PortalError):
+    """Der andere Check war schneller oder der Durchlauf ist vorbei - dieser bricht ab"""
+
+    def __init__(self, message):
+        super().__init__("hedge", message)
+
+
+class HedgeRace:
+    """Schiedsrichter zwischen Haupt- und Absicherungs-Check: es gibt genau einen Gewinner und höchstens eine Nachbuchung"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.completed = threading.Event()
+        self.started = False
+        self.winner = None
+        self.result = None
+        self.topup_owner = None
+        self.topup_message = None
+        self.topup_count = 0
+        self.topup_confirmed = False
+        self.topup_error = None
+
+    def offer(self, source, result):
+        """Meldet einen Messwert - True, wenn source gewonnen hat (oder schon vorher Gewinner war)"""
+        with self.lock:
+            if self.winner is None and not self.done.is_set():
+                self.winner = source
+                self.result = result
+                self.done.set()
+            return self.winner == source
+
+    def claim_topup(self, source):
+        """Nur der Gewinner darf nachbuchen, und nur er - auch bei Wiederholungen"""
+        with self.lock:
+            if self.winner != source or self.topup_owner not in (None, source):
+                return False
+            self.topup_owner = source
+            return True
+
+    def cancel(self):
+        self.done.set()
+
+
+def hedge_checkpoint():
+    """Bricht den laufenden Check ab, wenn der andere schon gewonnen hat"""
+    entry = ACTIVE_RACE.get()
+    if entry is not None:
+        race, source = entry
+        if race.done.is_set() and race.winner != source:
+            raise HedgeLost(f"{source}: {race.winner or 'Durchlauf'} ist schon fertig")
+
+
+def hedge_delay(account):
+    """p95 der erfolgreichen Browser-Durchläufe der letzten Woche, sonst HEDGE_DELAY"""
+    if HISTORY_STORE is not None and os.path.exists(HISTORY_FILE):
+        rows = HISTORY_STORE.query("SELECT duration FROM runs WHERE account = ? AND ts >= ? AND error IS NULL AND source != 'http'",
+                                   (str(account), time.time() - 7 * 86400))
+        durations = [r[0] for r in rows if r[0] is not None]
+        if len(durations) >= 10:
+            return max(HEDGE_MIN_DELAY, percentile(durations, 95))
+    return HEDGE_DELAY
+
+
+def hedge_check(race, browser_name):
+    """Absicherungs-Check mit eigener Playwright-Instanz in diesem Thread"""
+    ACTIVE_RACE.set((race, "hedge"))
+    session = BrowserSession(browser_name, max_runs=1)
+    try:
+        # Nicht acquire() - das würde dem Hauptbrowser das Cookie-Signal des Keep-alive wegnehmen.
+        # Eigene Kopie der Cookies: die Datei gehört dem Hauptcheck, solange die Absicherung nicht gewonnen hat
+        session.launch()
+        session.open_context(storage_state=read_json(COOKIE_FILE, {}))
+        context, page = session.context, session.page
+        goto_and_handle_cookies(page, DASHBOARD_URL, phase="hedge_goto")
+        if wait_for_ready(page, "Dashboard bereit (Absicherung)", {"login": on_login_page, "dashboard": on_dashboard}) != "dashboard":
+            # Ein zweiter Login parallel würde die Session des Hauptchecks beenden - der Login bleibt ihm überlassen
+            raise HedgeLost("Absicherung: Dashboard nicht erreicht - Login bleibt dem Hauptcheck überlassen")
+        GB, is_community_plus = read_datenvolumen(page, session.capture)
+        if not race.offer("hedge", (GB, is_community_plus)):
+            raise HedgeLost("Absicherung: Hauptcheck war schneller")
+        logging.info(f"🏁 Absicherung mit {browser_name} war schneller: {GB:.2f} GB")
+        save_storage_state(context, COOKIE_FILE)
+        METRICS.inc("hedge_wins_total", browser=browser_name)
+        if GB < 1.0 and race.claim_topup("hedge"):
+            race.topup_message, confirmed, race.topup_count = topup_burst(page, session.capture, GB, is_community_plus)
+            if confirmed is not None:
+                race.result = (confirmed, is_community_plus)
+                race.topup_confirmed = True
+    except HedgeLost:
+        logging.info("Absicherungs-Check abgebrochen.")
+    except Exception as e:
+        logging.warning(f"Absicherungs-Check mit {browser_name} fehlgeschlagen: {e}")
+        if race.topup_owner == "hedge":
+            race.topup_error = e
+    finally:
+        race.completed.set()
+        session.close()
+
+
+def start_hedge(account, browser_name=None):
+    """Startet den Timer für den Absicherungs-Check und liefert das Rennen"""
+    race = HedgeRace()
+    browser_name = browser_name or HEDGE_BROWSER
+    delay = hedge_delay(account)
+
+    def run():
+        if race.done.wait(delay):
+            return
+        if is_low_memory():
+            logging.info("Zu wenig Speicher für einen zweiten Browser - keine Absicherung.")
+            return
+        logging.info(f"🏁 Nach {delay:.1f}s noch kein Ergebnis - starte Absicherungs-Check mit {browser_name}.")
+        METRICS.inc("hedges_total", browser=browser_name)
+        race.started = True
+        hedge_check(race, browser_name)
+
+    threading.Thread(target=run, name="hedge", daemon=True).start()
+    return race
+
+
+def login_and_check_data():
+    if HEDGE != "1":
+        return check_data()
+    race = start_hedge(RUFNUMMER)
+    token = ACTIVE_RACE.set((race, "primary"))
+    try:
+        return check_data(race)
+    finally:
+        # Den anderen Check beenden, egal wer gewonnen hat
+        race.cancel()
+        ACTIVE_RACE.reset(token)
+
+
+def check_data(race=None):
+    global LAST_GB
+    run = RunRecord(RUFNUMMER)
+    profiler = RunProfiler(RUFNUMMER)
+
+    with timed_step("HTTP-Schnellpfad", "http_read"):
+        fast_result = http_read_datenvolumen()
+    if fast_result is not None:
+        GB, is_community_plus = fast_result
+        logging.info(f"HTTP-Schnellpfad: {GB:.2f} GB gelesen (Community+: {is_community_plus}).")
+        if GB >= 1.0:
+            LAST_GB = GB
+            METRICS.set_gauge("last_gb", GB, account=RUFNUMMER)
+            METRICS.inc("runs_total", result="http")
+            save_last_gb(STATE_FILE, LAST_GB)
+            interval = get_interval(config, GB, RUFNUMMER)
+            logging.info(f"Aktuelles Datenvolumen: {GB:.2f} GB")
+            recovered = BREAKER.record_success(RUFNUMMER)
+            if recovered:
+                send_telegram_message(recovered)
+            send_telegram_message(f"{RUFNUMMER}: Noch {GB:.2f} GB übrig. Nächster Run in {interval} Sekunden. ✅")
+            run.finish(GB, is_community_plus, source="http")
+            profiler.finish()
+            return interval
+        logging.info("Unter 1 GB - Browser wird für die Nachbuchung gestartet.")
+
+    error = None
+    # Bei offenem Breaker die Phasen nicht wiederholen - das Portal ist gestört, der nächste Run kommt gestreckt
+    phase_attempts = 1 if BREAKER.is_open(RUFNUMMER) else None
+    for attempt in range(3):  # Die Phasen wiederholen sich selbst - hier nur ein neuer Browser, wenn der alte kaputt ist
+        run_start = time.monotonic()
+        try:
+            context, page = SESSION.acquire()
+            profiler.attach(context)
+
+            def open_dashboard():
+                # Dashboard aufrufen - die Verbrauchsdaten werden dabei direkt aus dem Netzwerk mitgeschnitten
+                SESSION.capture.reset()
+                goto_and_handle_cookies(page, DASHBOARD_URL, phase="dashboard_goto", cookie_file=COOKIE_FILE)
+                # Warten bis entweder das Dashboard steht oder auf die Login-Seite umgeleitet wurde
+                wait_for_ready(page, "Dashboard bereit", {"login": on_login_page, "dashboard": on_dashboard})
+
+            with_retry("dashboard", open_dashboard, attempts=phase_attempts)
+
+            with timed_step("Login-Prüfung", "login"):
+                # Falsche Zugangsdaten nicht wiederholt probieren (auth)
+                with_retry("login", lambda: ensure_logged_in(context, page),
+                           retry_kinds=("network", "selector", "portal_down"), before_retry=open_dashboard,
+                           attempts=phase_attempts)
+
+            with timed_step("Datenvolumen gelesen", "get_datenvolumen"):
+                GB, is_community_plus = with_retry("read", lambda: read_datenvolumen(page, SESSION.capture),
+                                                   before_retry=open_dashboard, attempts=phase_attempts)
+            if race is not None and not race.offer("primary", (GB, is_community_plus)):
+                raise HedgeLost("Absicherung war schneller")
+            booked = 0
+            confirmed = None
+            if GB < 1.0:
+                if race is not None and not race.claim_topup("primary"):
+                    raise HedgeLost("Nachbuchung gehört der Absicherung")
+                with timed_step("Nachbuchung", "topup_click"):
+                    message, confirmed, booked = topup_burst(page, SESSION.capture, GB, is_community_plus,
+                                                             before_retry=open_dashboard)
+                # Das nächste Intervall nach dem bestätigten Volumen richten
+                if confirmed is not None:
+                    GB = confirmed
+
+            LAST_GB = GB
+            METRICS.set_gauge("last_gb", GB, account=RUFNUMMER)
+
+            save_last_gb(STATE_FILE, LAST_GB)
+
+            interval = get_interval(config, GB, RUFNUMMER)
+
+            if booked:
+                send_telegram_message(f"{message} Nächster Run in {interval} Sekunden.")
+            else:
+                logging.info(f"Aktuelles Datenvolumen: {GB:.2f} GB")
+                send_telegram_message(f"{RUFNUMMER}: Noch {GB:.2f} GB übrig. Nächster Run in {interval} Sekunden. ✅")
+
+            if SESSION.request_filter:
+                logging.info(SESSION.request_filter.summary())
+
+            METRICS.observe("run", time.monotonic() - run_start)
+            METRICS.inc("runs_total", result="success")
+            METRICS.record_browser_resources()
+            run.finish(GB, is_community_plus, topup=confirmed is not None, attempts=attempt + 1)
+            profiler.finish(page)
+            recovered = BREAKER.record_success(RUFNUMMER)
+            if recovered:
+                send_telegram_message(recovered)
+            return interval
+
+        except HedgeLost:
+            logging.info("Hauptcheck abgebrochen - die Absicherung war schneller.")
+            profiler.finish(SESSION.page)
+            break
+        except Exception as e:
+            error = e
+            kind = classify_error(e)
+            logging.error(f"Fehler im Versuch {attempt+1} ({kind}): {e}")
+            run.fail(e)
+            METRICS.inc("retries_total", kind=kind)
+            METRICS.record_browser_resources()
+            # Vor dem Recycling sichern, solange Seite und Kontext noch da sind
+            profiler.finish(SESSION.page, e)
+            if kind in ("browser", "unknown"):
+                # Nach einem Absturz frisch starten statt einen kaputten Browser weiterzuverwenden
+                SESSION.recycle()
+            if kind != "browser":
+                # Die Phasen haben ihre Wiederholungen schon verbraucht - nur ein abgestürzter Browser bekommt einen neuen Versuch
+                break
+
+        if attempt < 2:
+            time.sleep(backoff_delay(attempt + 1, base=2))
+
+    # Hat die Absicherung gewonnen (oder läuft sie noch), ihr Ergebnis übernehmen
+    if race is not None and race.started:
+        # Auch eine laufende Nachbuchung der Absicherung abwarten, sonst wird ein Zwischenstand gemeldet
+        race.completed.wait(READY_TIMEOUT * 3 + TOPUP_CONFIRM_TIMEOUT * TOPUP_BURST_MAX)
+        if race.winner == "hedge":
+            return finish_hedged(race, run, attempt + 1)
+    logging.error(f"Skript hat nach {attempt + 1} Versuchen aufgegeben.")
+    METRICS.inc("runs_total", result="failure")
+    run.finish(attempts=attempt + 1)
+    notify = BREAKER.record_failure(RUFNUMMER, classify_error(error), error)
+    if notify:
+        send_telegram_message(notify)
+    return BREAKER.interval(RUFNUMMER, get_interval(config, None, RUFNUMMER))
+
+def finish_hedged(race, run, attempts):
+    """Übernimmt das Ergebnis des Absicherungs-Checks"""
+    global LAST_GB
+    GB, is_community_plus = race.result
+    LAST_GB = GB
+    METRICS.set_gauge("last_gb", GB, account=RUFNUMMER)
+    save_last_gb(STATE_FILE, LAST_GB)
+    interval = get_interval(config, GB, RUFNUMMER)
+    complete = race.completed.is_set()
+    if not complete and race.topup_owner == "hedge":
+        # Die Absicherung bucht noch - nichts als erledigt melden, der nächste Durchlauf sieht das Ergebnis
+        logging.warning("Nachbuchung über die Absicherung läuft noch - Ergebnis unklar.")
+        send_telegram_message(f"{RUFNUMMER}: ⚠️ Nachbuchung über die Absicherung läuft noch - wird beim nächsten Durchlauf geprüft. "
+                              f"Nächster Run in {interval} Sekunden.")
+    elif race.topup_message:
+        send_telegram_message(race.topup_message)
+    elif race.topup_error is not None:
+        # Nicht noch einmal klicken - ob die Buchung durchging, ist unklar
+        send_telegram_message(f"{RUFNUMMER}: ❌ Nachbuchung über die Absicherung fehlgeschlagen: {race.topup_error}")
+    else:
+        logging.info(f"Aktuelles Datenvolumen: {GB:.2f} GB")
+        send_telegram_message(f"{RUFNUMMER}: Noch {GB:.2f} GB übrig. Nächster Run in {interval} Sekunden. ✅")
+    METRICS.inc("runs_total", result="hedge")
+    run.finish(GB, is_community_plus, topup=complete and race.topup_confirmed, source="hedge", attempts=attempts)
+    recovered = BREAKER.record_success(RUFNUMMER)
+    if recovered:
+        send_telegram_message(recovered)
+    return interval
+
+def get_smart_interval(last_gb=None):
+    if last_gb is None:
+        last_gb = LAST_GB
+    if last_gb >= 10:
         return random.randint(3600, 5400)
-    elif LAST_GB >= 5:
+    elif last_gb >= 5:
         return random.randint(900, 1800)
-    elif LAST_GB >= 3:
+    elif last_gb >= 3:
         return random.randint(600, 900)
-    elif LAST_GB >= 2:
+    elif last_gb >= 2:
         return random.randint(300, 450)
-    elif LAST_GB >= 1.2:
+    elif last_gb >= 1.2:
         return random.randint(150, 240)
-    elif LAST_GB >= 1.0:
+    elif last_gb >= 1.0:
         return random.randint(60, 90)
     else:
         return 60  # Fallback
 
 
-def get_interval(config):
+# Predictive-Modus: Verbrauchsrate schätzen und kurz vor dem Unterschreiten von 1 GB prüfen
+def consumption_rates(readings):
+    """Verbrauch in GB/h zwischen aufeinanderfolgenden Messungen, Nachbuchungen (Anstiege) werden übersprungen"""
+    rates = []
+    for (t0, gb0), (t1, gb1) in zip(readings, readings[1:]):
+        hours = (t1 - t0) / 3600
+        if hours <= 0 or gb1 > gb0:
+            continue
+        rates.append(((t0 + t1) / 2, (gb0 - gb1) / hours))
+    return rates
+
+
+def estimate_rate(readings, alpha=0.3):
+    """Geglättete Verbrauchsrate (EWMA) und Tageszeit-Faktoren pro Stunde"""
+    rates = consumption_rates(readings)
+    if not rates:
+        return None, {}
+
+    smoothed = rates[0][1]
+    for _, rate in rates[1:]:
+        smoothed = alpha * rate + (1 - alpha) * smoothed
+
+    overall = sum(r for _, r in rates) / len(rates)
+    by_hour = {}
+    for ts, rate in rates:
+        by_hour.setdefault(time.localtime(ts).tm_hour, []).append(rate)
+    factors = {}
+    if overall > 0:
+        for hour, values in by_hour.items():
+            # Erst ab ein paar Messungen pro Stunde dem Muster trauen
+            if len(values) >= 3:
+                factors[hour] = (sum(values) / len(values)) / overall
+    return smoothed, factors
+
+
+def predict_interval(readings, last_gb, now, threshold=1.0, min_interval=60, max_interval=3600, safety=0.5):
+    """Sekunden bis zur nächsten Prüfung, None wenn noch zu wenig Daten vorliegen"""
+    if last_gb < threshold:
+        return min_interval
+
+    rate, factors = estimate_rate(readings)
+    if rate is None:
+        return None
+
+    # Stundenweise vorwärts rechnen, bis das Restvolumen die Schwelle erreicht
+    remaining = last_gb - threshold
+    elapsed = 0.0 if rate > 0 else max_interval
+    while remaining > 0 and elapsed < max_interval:
+        hour = time.localtime(now + elapsed).tm_hour
+        hourly = rate * factors.get(hour, 1.0)
+        step = 3600 - (now + elapsed) % 3600
+        used = hourly * step / 3600
+        if used >= remaining:
+            elapsed += remaining / hourly * 3600
+            remaining = 0
+        else:
+            remaining -= used
+            elapsed += step
+
+    # Die geglättete Rate hinkt Verbrauchsspitzen hinterher - auch bei einer hohen Rate (90. Perzentil)
+    # noch vor der Schwelle prüfen, sonst liegt die Leitung bis zur nächsten Prüfung unter 1 GB
+    peak = percentile([r for _, r in consumption_rates(readings)], 90)
+    if peak:
+        elapsed = min(elapsed, (last_gb - threshold) / peak * 3600)
+
+    return int(max(min_interval, min(max_interval, elapsed * safety)))
+
+
+def get_predictive_interval(last_gb=None, account=None, now=None, readings=None):
+    """now und readings setzt der Simulator, sonst gelten Uhrzeit und Verlauf"""
+    if last_gb is None:
+        last_gb = LAST_GB
+    now = now if now is not None else time.time()
+    if readings is None:
+        readings = []
+        if HISTORY_STORE is not None:
+            readings = HISTORY_STORE.readings(account or RUFNUMMER, now - 7 * 86400)
+    # Der aktuelle Durchlauf steht noch nicht im Verlauf
+    if not readings or readings[-1][1] != last_gb:
+        readings = readings + [(now, last_gb)]
+    interval = predict_interval(readings, last_gb, now, min_interval=PREDICTIVE_MIN_INTERVAL,
+                                max_interval=PREDICTIVE_MAX_INTERVAL, safety=PREDICTIVE_SAFETY)
+    if interval is None:
+        logging.info("Predictive: noch zu wenig Messwerte - nutze smart-Intervall.")
+        return get_smart_interval(last_gb)
+    logging.info(f"Predictive: nächste Prüfung in {interval}s (Restvolumen {last_gb:.2f} GB).")
+    return interval
+
+
+def get_interval(config, last_gb=None, account=None, now=None, readings=None):
     mode = config.get("SLEEP_MODE", "random")
     if mode == "smart":
-        return get_smart_interval()
+        return get_smart_interval(last_gb)
+    elif mode == "predictive":
+        return get_predictive_interval(last_gb, account, now, readings)
     elif mode == "fixed":
         try:
             return int(config.get("SLEEP_INTERVAL", 90))
@@ -610,18 +3083,565 @@ def get_interval(config):
         return random.randint(300, 500)
 
 
-if __name__ == "__main__":
+# Multi-Account-Modus: ein gemeinsamer Browser, ein isolierter Kontext pro Konto
+async def save_consent_async(page, cookie_file, timeout=CONSENT_SAVE_TIMEOUT):
+    import asyncio
+    deadline = time.monotonic() + timeout
     while True:
-        check_for_update()
-        logging.info("Starte neuen Durchlauf...")
-        interval = login_and_check_data()
-        logging.info(f"💤 Warte {interval} Sekunden...")
-        time.sleep(interval if interval is not None else 90)
+        state = await page.context.storage_state()
+        if state_has_consent(state):
+            await asyncio.to_thread(write_json, cookie_file, state)
+            return True
+        if time.monotonic() >= deadline:
+            logging.info("Consent noch nicht gespeichert - wird mit den Cookies nach dem Login gesichert.")
+            return False
+        await page.wait_for_timeout(100)
 
 
+async def install_consent_handler_async(page):
+    """Wie install_consent_handler für die async API"""
+    async def dismiss(locator=None):
+        await page.locator(CONSENT_DENY_SELECTOR).click()
+        CONSENTED.add(page.context)
+        logging.info("Cookie-Banner im Hintergrund geschlossen.")
 
+    try:
+        await page.add_locator_handler(page.locator(CONSENT_DENY_SELECTOR), dismiss)
+    except Exception as e:
+        logging.warning(f"Consent-Handler konnte nicht registriert werden: {e}")
+
+
+async def handle_cookie_banner_async(page, cookie_file=None):
+    if page.context in CONSENTED:
+        return
+    try:
+        if await page.evaluate(DISMISS_CONSENT_JS, CONSENT_DENY_KEYWORDS):
+            logging.info("Achtung Krümelmonster")
+            CONSENTED.add(page.context)
+            if cookie_file:
+                await save_consent_async(page, cookie_file)
+    except Exception as e:
+        logging.warning(f"Fehler im handle_cookie_banner_async: {e}")
 
 
+async def login_erfolgreich_async(page, timeout=8000):
+    """Wie on_dashboard: die Überschrift zählt erst, wenn die Login-Seite verlassen ist - sie hat ihre eigene h1"""
+    deadline = time.monotonic() + timeout / 1000
+    while True:
+        if not on_login_page(page):
+            try:
+                heading = await page.text_content(HEADING_SELECTOR, timeout=READY_POLL_MS * 5)
+                if heading and "Übersicht" in heading:
+                    return True
+            except Exception:
+                # Während einer Navigation kann der Ausführungskontext kurz weg sein
+                pass
+        if time.monotonic() >= deadline:
+            return False
+        await page.wait_for_timeout(READY_POLL_MS)
+
 
+async def get_datenvolumen_async(page):
+    return interpret_extraction(await page.evaluate(EXTRACT_USAGE_JS, selector_groups()))
 
 
+async def read_datenvolumen_async(page, capture):
+    """Wie read_datenvolumen: erst die mitgeschnittene Portal-Antwort, sonst auf den Meter warten"""
+    usage = await capture.wait_async(page, CAPTURE_TIMEOUT, USAGE_METER_SELECTOR)
+    if usage is not None:
+        return usage["remaining"], usage["community_plus"]
+    try:
+        await page.wait_for_selector(USAGE_METER_SELECTOR, timeout=10000)
+    except Exception:
+        logging.warning("Usage-Meter nicht rechtzeitig gerendert.")
+    return await get_datenvolumen_async(page)
+
+
+async def book_topup_async(page, is_community_plus):
+    result = await page.evaluate(EXTRACT_USAGE_JS, selector_groups())
+    selector, index = find_topup_target(result, is_community_plus)
+    try:
+        if selector:
+            await page.click(selector)
+            return True
+        if index is not None:
+            await page.locator("one-button").nth(index).click()
+            return True
+    except Exception as e:
+        logging.warning(f"Fehler beim klicken: {e}")
+    return False
+
+
+async def read_meter_quietly_async(page, is_community_plus):
+    """Wie read_meter_quietly für die async API"""
+    try:
+        result = await page.evaluate(EXTRACT_USAGE_JS, selector_groups())
+        entry = result.get("gb_community" if is_community_plus else "gb_normal")
+        return parse_datenvolumen(entry["text"]) if entry else None
+    except Exception:
+        return None
+
+
+async def confirm_topup_async(page, capture, before_gb, is_community_plus, timeout=None):
+    """Wie confirm_topup für die async API - None, wenn kein höheres Restvolumen kommt"""
+    deadline = time.monotonic() + (timeout or TOPUP_CONFIRM_TIMEOUT)
+    while time.monotonic() < deadline:
+        if capture.usage is not None and capture.usage["remaining"] > before_gb + 0.5:
+            return capture.usage["remaining"]
+        gb = await read_meter_quietly_async(page, is_community_plus)
+        if gb is not None and gb > before_gb + 0.5:
+            return gb
+        await page.wait_for_timeout(500)
+    return None
+
+
+async def topup_burst_async(page, capture, rufnummer, GB, is_community_plus):
+    """Wie topup_burst für den Multi-Account-Modus: jede Buchung bestätigen, bei Bedarf weiter nachbuchen"""
+    import asyncio
+    message = f"{rufnummer}: Aktuelles Datenvolumen: {GB:.2f} GB – 1 GB wurde erfolgreich nachgebucht. 📲"
+    booked = 0
+    confirmed = None
+    while booked < TOPUP_BURST_MAX:
+        before = confirmed if confirmed is not None else GB
+        capture.reset()
+        if not await book_topup_async(page, is_community_plus):
+            if booked == 0:
+                raise PortalError("selector", "Kein gültiger 1 GB Button gefunden.")
+            logging.info(f"{rufnummer}: Keine weitere Nachbuchung möglich.")
+            break
+        booked += 1
+        METRICS.inc("topups_total")
+        gb = await confirm_topup_async(page, capture, before, is_community_plus)
+        if gb is None:
+            logging.warning(f"{rufnummer}: Nachbuchung nicht bestätigt - Restvolumen hat sich nicht erhöht.")
+            METRICS.inc("topups_unconfirmed_total")
+            message += " ⚠️ Noch nicht bestätigt - wird beim nächsten Durchlauf geprüft."
+            return message, confirmed, booked
+        logging.info(f"{rufnummer}: Nachbuchung bestätigt: {before:.2f} GB → {gb:.2f} GB")
+        confirmed = gb
+        if not await asyncio.to_thread(needs_more_topup, gb, rufnummer):
+            break
+        logging.info(f"{rufnummer}: Verbrauch ist hoch - buche im selben Durchlauf weiter nach.")
+    if confirmed is not None:
+        message += f" Bestätigt: {booked}× 1 GB, jetzt {confirmed:.2f} GB."
+    return message, confirmed, booked
+
+
+async def check_account_async(browser, account, semaphore, stealth_async=None, request_filter=None):
+    import asyncio
+    # Alles, was Dateien, SQLite oder Locks anfasst, läuft per to_thread - sonst stehen die anderen Konten
+    rufnummer = account["RUFNUMMER"]
+    run = RunRecord(rufnummer)
+    fast_result = await asyncio.to_thread(http_read_datenvolumen, account["COOKIE_FILE"])
+    if fast_result is not None and fast_result[0] >= 1.0:
+        GB = fast_result[0]
+        await asyncio.to_thread(save_last_gb, account["STATE_FILE"], GB)
+        METRICS.set_gauge("last_gb", GB, account=rufnummer)
+        METRICS.inc("runs_total", result="http")
+        logging.info(f"{rufnummer}: Aktuelles Datenvolumen (HTTP): {GB:.2f} GB")
+        recovered = await asyncio.to_thread(BREAKER.record_success, rufnummer)
+        if recovered:
+            await asyncio.to_thread(send_telegram_message, recovered)
+        await asyncio.to_thread(send_telegram_message, f"{rufnummer}: Noch {GB:.2f} GB übrig. ✅")
+        await asyncio.to_thread(run.finish, GB, fast_result[1], source="http")
+        return await asyncio.to_thread(get_interval, config, GB, rufnummer)
+
+    # Eigene Zähler pro Konto, sonst mischen sich die Statistiken paralleler Checks
+    request_filter = request_filter.fork() if request_filter else None
+    async with semaphore:
+        error = None
+        # Bei offenem Breaker nur ein Versuch - der nächste Run kommt ohnehin gestreckt
+        attempts = 1 if await asyncio.to_thread(BREAKER.is_open, rufnummer) else 3
+        for attempt in range(attempts):
+            context = None
+            try:
+                if os.path.exists(account["COOKIE_FILE"]):
+                    context = await browser.new_context(user_agent=USER_AGENT, storage_state=account["COOKIE_FILE"])
+                else:
+                    context = await browser.new_context(user_agent=USER_AGENT)
+                if await asyncio.to_thread(storage_has_consent, account["COOKIE_FILE"]):
+                    CONSENTED.add(context)
+                if request_filter:
+                    await context.route("**/*", request_filter.handle_async)
+                    context.on("response", request_filter.on_response)
+                page = await context.new_page()
+                if stealth_async:
+                    await stealth_async(page)
+                await install_consent_handler_async(page)
+                # Vor dem ersten goto anhängen, sonst ist die Verbrauchsantwort schon vorbei
+                capture = UsageCapture(page, async_api=True)
+
+                await page.goto(DASHBOARD_URL, wait_until="domcontentloaded")
+                await handle_cookie_banner_async(page, account["COOKIE_FILE"])
+
+                keeper = await asyncio.to_thread(session_keeper, account["COOKIE_FILE"])
+                logged_in = "login" not in page.url and await login_erfolgreich_async(page)
+                if not logged_in:
+                    logging.info(f"{rufnummer}: Nicht eingeloggt - Login wird durchgeführt...")
+                    await asyncio.to_thread(keeper.note_rejected)
+                    await context.clear_cookies()
+                    await page.goto(LOGIN_URL, wait_until="domcontentloaded")
+                    await handle_cookie_banner_async(page, account["COOKIE_FILE"])
+                    await page.fill('#input-5', rufnummer)
+                    await page.fill('#input-6', account["PASSWORT"])
+                    await page.click('one-button[data-type="main-action"] button')
+                    if not await login_erfolgreich_async(page, timeout=30000):
+                        raise PortalError("auth", "Login fehlgeschlagen - Übersichtsseite nicht sichtbar.")
+                    logging.info(f"{rufnummer}: Login erfolgreich.")
+
+                state = await context.storage_state()
+                await asyncio.to_thread(write_json, account["COOKIE_FILE"], state)
+                await asyncio.to_thread(keeper.note_ok if logged_in else keeper.note_login)
+
+                GB, is_community_plus = await read_datenvolumen_async(page, capture)
+                confirmed = None
+
+                if GB < 1.0:
+                    logging.info(f"{rufnummer}: Versuche, 1 GB Datenvolumen nachzubuchen...")
+                    message, confirmed, booked = await topup_burst_async(page, capture, rufnummer, GB, is_community_plus)
+                    # Das nächste Intervall nach dem bestätigten Volumen richten
+                    if confirmed is not None:
+                        GB = confirmed
+                    await asyncio.to_thread(send_telegram_message, message)
+                else:
+                    logging.info(f"{rufnummer}: Aktuelles Datenvolumen: {GB:.2f} GB")
+                    await asyncio.to_thread(send_telegram_message, f"{rufnummer}: Noch {GB:.2f} GB übrig. ✅")
+
+                await asyncio.to_thread(save_last_gb, account["STATE_FILE"], GB)
+                if request_filter:
+                    logging.info(f"{rufnummer}: {request_filter.summary()}")
+                METRICS.set_gauge("last_gb", GB, account=rufnummer)
+                METRICS.inc("runs_total", result="success")
+                # Als Nachbuchung zählt nur, was das Portal bestätigt hat
+                await asyncio.to_thread(run.finish, GB, is_community_plus, topup=confirmed is not None, attempts=attempt + 1)
+                recovered = await asyncio.to_thread(BREAKER.record_success, rufnummer)
+                if recovered:
+                    await asyncio.to_thread(send_telegram_message, recovered)
+                return await asyncio.to_thread(get_interval, config, GB, rufnummer)
+
+            except Exception as e:
+                error = e
+                kind = classify_error(e)
+                logging.error(f"{rufnummer}: Fehler im Versuch {attempt+1} ({kind}): {e}")
+                await asyncio.to_thread(run.fail, e)
+                METRICS.inc("retries_total", kind=kind)
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+
+            if classify_error(error) in ("auth", "portal_down"):
+                break
+            if attempt < attempts - 1:
+                await asyncio.sleep(backoff_delay(attempt + 1, base=2))
+
+        logging.error(f"{rufnummer}: Konto hat nach {attempt + 1} Versuchen aufgegeben.")
+        if request_filter:
+            logging.info(f"{rufnummer}: {request_filter.summary()}")
+        METRICS.inc("runs_total", result="failure")
+        await asyncio.to_thread(run.finish, attempts=attempt + 1)
+        notify = await asyncio.to_thread(BREAKER.record_failure, rufnummer, classify_error(error), error)
+        if notify:
+            await asyncio.to_thread(send_telegram_message, notify)
+        last_gb = await asyncio.to_thread(load_last_gb, account["STATE_FILE"])
+        interval = await asyncio.to_thread(get_interval, config, last_gb, rufnummer)
+        return await asyncio.to_thread(BREAKER.interval, rufnummer, interval)
+
+
+# Worker-Modus: Leases und nächster Prüfzeitpunkt pro Konto in einer geteilten SQLite-Datei
+LEASE_FILE = os.path.join(DATA_DIR, "leases.db")
+
+
+class LeaseStore:
+    """Zeitlich begrenzte Leases auf Konten - ein Konto wird nie von zwei Workern gleichzeitig geprüft,
+    stirbt ein Worker, laufen seine Leases ab und andere übernehmen"""
+
+    def __init__(self, path, owner, lease_seconds=300):
+        self.path = path
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            # Autocommit, Transaktionen werden explizit mit BEGIN IMMEDIATE geöffnet. Bewusst das Standard-Journal
+            # statt WAL: WAL braucht Shared Memory und funktioniert nur, wenn alle Worker auf demselben Host laufen
+            self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            # Der WAL-Modus bleibt in der Datei stehen - eine von einer älteren Version angelegte leases.db zurückstellen
+            self.conn.execute("PRAGMA journal_mode=DELETE")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS leases (
+                account TEXT PRIMARY KEY,
+                owner TEXT,
+                expires REAL NOT NULL DEFAULT 0,
+                next_run REAL NOT NULL DEFAULT 0)""")
+        return self.conn
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self.lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, accounts, limit):
+        """Holt bis zu limit fällige Konten, deren Lease frei oder abgelaufen ist"""
+        now = time.time()
+        placeholders = ",".join("?" * len(accounts))
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO leases (account) VALUES (?)", [(a,) for a in accounts])
+            rows = conn.execute(f"""SELECT account, owner FROM leases
+                WHERE account IN ({placeholders}) AND next_run <= ? AND (owner IS NULL OR owner = ? OR expires < ?)
+                ORDER BY next_run LIMIT ?""", (*accounts, now, self.owner, now, limit)).fetchall()
+            conn.executemany("UPDATE leases SET owner = ?, expires = ? WHERE account = ?",
+                             [(self.owner, now + self.lease_seconds, account) for account, _ in rows])
+        for account, owner in rows:
+            if owner and owner != self.owner:
+                logging.warning(f"{account}: Lease von {owner} abgelaufen - übernommen.")
+                METRICS.inc("lease_takeovers_total")
+        return [account for account, _ in rows]
+
+    def renew(self, accounts):
+        """Verlängert die eigenen Leases, liefert die Konten, deren Lease verloren ging"""
+        now = time.time()
+        lost = []
+        with self.transaction() as conn:
+            for account in accounts:
+                cursor = conn.execute("UPDATE leases SET expires = ? WHERE account = ? AND owner = ?",
+                                      (now + self.lease_seconds, account, self.owner))
+                if cursor.rowcount == 0:
+                    lost.append(account)
+        for account in lost:
+            logging.warning(f"{account}: Lease verloren - ein anderer Worker hat übernommen.")
+        return lost
+
+    def release(self, account, next_run):
+        with self.transaction() as conn:
+            conn.execute("UPDATE leases SET owner = NULL, expires = 0, next_run = ? WHERE account = ? AND owner = ?",
+                         (next_run, account, self.owner))
+
+    def release_all(self):
+        """Beim Beenden: eigene Leases sofort freigeben statt sie ablaufen zu lassen"""
+        with self.transaction() as conn:
+            conn.execute("UPDATE leases SET owner = NULL, expires = 0 WHERE owner = ?", (self.owner,))
+
+    def next_due(self, accounts):
+        """Frühester Zeitpunkt, zu dem eines der Konten fällig wird"""
+        placeholders = ",".join("?" * len(accounts))
+        with self.lock:
+            # Konten unter fremder Lease frühestens, wenn diese abläuft
+            row = self.connect().execute(f"""SELECT MIN(CASE WHEN owner IS NOT NULL AND owner != ? THEN MAX(next_run, expires)
+                ELSE next_run END) FROM leases WHERE account IN ({placeholders})""", (self.owner, *accounts)).fetchone()
+        return row[0] if row and row[0] is not None else time.time()
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+LEASES = LeaseStore(LEASE_FILE, worker_id(), LEASE_SECONDS) if WORKER == "1" else None
+
+
+async def renew_leases(leases, tasks):
+    """Hält die Leases am Leben, solange die Prüfungen laufen - geht eine verloren, wird die Prüfung des Kontos abgebrochen"""
+    import asyncio
+    while True:
+        await asyncio.sleep(leases.lease_seconds / 3)
+        running = [account for account, task in tasks.items() if not task.done()]
+        # Die Sperre auf leases.db kann dauern - nicht die Event-Loop der Prüfungen blockieren
+        lost = await asyncio.to_thread(leases.renew, running)
+        for account in lost:
+            # Sonst prüfen zwei Worker dasselbe Konto gleichzeitig
+            logging.warning(f"{account}: Prüfung abgebrochen - das Konto gehört jetzt einem anderen Worker.")
+            METRICS.inc("lease_lost_total")
+            tasks[account].cancel()
+
+
+async def multi_account_loop(accounts, once=False, leases=None):
+    import asyncio
+    from playwright.async_api import async_playwright
+    try:
+        from playwright_stealth import stealth_async
+    except ImportError:
+        stealth_async = None
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    request_filter = RequestFilter.from_config(config) if request_filter_enabled() else None
+    logging.info(f"Multi-Account-Modus: {len(accounts)} Konten, max. {MAX_CONCURRENCY} gleichzeitig.")
+    if leases is not None:
+        logging.info(f"Worker-Modus als {leases.owner}: Konten werden über {leases.path} verteilt.")
+    numbers = [a["RUFNUMMER"] for a in accounts]
+
+    async with async_playwright() as p:
+        browser = None
+        cycles = 0
+        budget_mb = memory_budget_mb()
+        remote_retry_at = 0.0
+        remote = False
+        try:
+            while not UPDATE_READY.is_set():
+
+                # Läuft nur der lokale Ersatz, nach REMOTE_RETRY wieder den entfernten Browser versuchen
+                retry_remote = browser is not None and not remote and remote_browser_for(BROWSER) and time.monotonic() >= remote_retry_at
+                if (browser is None or not browser.is_connected() or (BROWSER_RECYCLE_RUNS and cycles >= BROWSER_RECYCLE_RUNS)
+                        or over_memory_budget(budget_mb) or retry_remote):
+                    if browser is not None:
+                        try:
+                            await browser.close()
+                        except Exception:
+                            pass
+                    start = time.monotonic()
+                    browser = None
+                    remote = False
+                    endpoint = remote_browser_for(BROWSER)
+                    if endpoint and time.monotonic() >= remote_retry_at:
+                        try:
+                            browser = await connect_remote_async(p, BROWSER, endpoint)
+                            remote = True
+                            logging.info(f"⏱ Mit entferntem {BROWSER} verbunden in {time.monotonic() - start:.2f}s ({endpoint})")
+                        except Exception as e:
+                            remote_retry_at = time.monotonic() + REMOTE_RETRY
+                            remote_failed(endpoint, e)
+                    if browser is None:
+                        engine = getattr(p, BROWSER)
+                        browser = await engine.launch(headless=HEADLESS, **launch_options(BROWSER, budget_mb))
+                        logging.info(f"⏱ {BROWSER} gestartet in {time.monotonic() - start:.2f}s")
+                    cycles = 0
+
+                # Jedes Konto hat sein eigenes Intervall - nur fällige Konten werden geprüft
+                if leases is not None:
+                    # Worker-Modus: nur Konten, deren Lease dieser Worker bekommen hat
+                    claimed = set(await asyncio.to_thread(leases.claim, numbers, MAX_CONCURRENCY))
+                    due = [a for a in accounts if a["RUFNUMMER"] in claimed]
+                    METRICS.set_gauge("leases_held", len(due))
+                else:
+                    due = [a for a in accounts if a.get("NEXT_RUN", 0) <= time.monotonic()]
+                if due:
+                    logging.info(f"Starte neuen Durchlauf für {len(due)} von {len(accounts)} Konten...")
+                    tasks = {account["RUFNUMMER"]: asyncio.create_task(check_account_async(browser, account, semaphore, stealth_async, request_filter))
+                             for account in due}
+                    renewer = asyncio.create_task(renew_leases(leases, tasks)) if leases is not None else None
+                    try:
+                        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+                    finally:
+                        if renewer is not None:
+                            renewer.cancel()
+                    cycles += 1
+
+                    for account, interval in zip(due, results):
+                        if isinstance(interval, asyncio.CancelledError):
+                            # Lease verloren - das Konto plant jetzt der neue Besitzer
+                            stop_keepalive(account["COOKIE_FILE"])
+                            continue
+                        if isinstance(interval, BaseException):
+                            raise interval
+                        interval = interval if interval is not None else 90
+                        if leases is not None:
+                            await asyncio.to_thread(leases.release, account["RUFNUMMER"], time.time() + interval)
+                            stop_keepalive(account["COOKIE_FILE"])
+                        account["NEXT_RUN"] = time.monotonic() + interval
+                if once:
+                    break
+
+                if leases is not None:
+                    # Regelmäßig nachsehen, ob Leases anderer Worker abgelaufen sind
+                    next_due = await asyncio.to_thread(leases.next_due, numbers)
+                    wait = max(1, int(min(next_due - time.time(), leases.lease_seconds / 2)))
+                else:
+                    wait = max(1, int(min(a["NEXT_RUN"] for a in accounts) - time.monotonic()))
+                logging.info(f"💤 Warte {wait} Sekunden...")
+                await asyncio.sleep(wait)
+        finally:
+            if leases is not None:
+                leases.release_all()
+            if browser is not None:
+                await browser.close()
+
+
+def run_once(accounts):
+    """Genau eine Prüfung aller Konten, liefert den Exit-Code"""
+    try:
+        if len(accounts) > 1 or LEASES is not None:
+            import asyncio
+            asyncio.run(multi_account_loop(accounts, once=True, leases=LEASES))
+        else:
+            login_and_check_data()
+    finally:
+        SESSION.close()
+        # Erst nach der Prüfung: der Update-Check verzögert sie nicht, und ein bereitgelegtes Update
+        # beendet die Schleife nicht, bevor geprüft wurde - es gilt ab dem nächsten Aufruf
+        check_for_update()
+        NOTIFIER.flush()
+    if LEASES is not None:
+        # Im Worker-Modus zählen nur die Konten, die dieser Worker übernommen hat
+        accounts = [a for a in accounts if a["RUFNUMMER"] in RUN_RESULTS]
+    failed = [a["RUFNUMMER"] for a in accounts if not RUN_RESULTS.get(a["RUFNUMMER"])]
+    logging.info(f"⏱ Fertig nach {time.perf_counter() - START_TIME:.2f}s" + (f" - fehlgeschlagen: {', '.join(failed)}" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AT-Extender")
+    parser.add_argument("--history", action="store_true", help="Auswertung des Verlaufs ausgeben und beenden")
+    parser.add_argument("--account", help="Nur dieses Konto auswerten")
+    parser.add_argument("--days", type=float, default=7, help="Zeitraum der Auswertung in Tagen")
+    parser.add_argument("--once", action="store_true",
+                        help="Genau eine Prüfung und beenden (Exit-Code 0 = ok, 1 = fehlgeschlagen), z. B. für cron oder systemd-Timer")
+    args = parser.parse_args()
+
+    if args.history:
+        print_history(args.account, args.days)
+        sys.exit(0)
+
+    if not has_credentials(config):
+        logging.error("Keine Konfiguration gefunden! Bitte config.json, Umgebungsvariablen oder Docker Secrets bereitstellen.")
+        sys.exit(1)
+
+    init_state()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
+    # Beim letzten Lauf nicht zugestellte Nachrichten nachsenden
+    NOTIFIER.load_queue()
+    if TELEGRAM == "1" and NOTIFIER.pending:
+        NOTIFIER.start()
+
+    ACCOUNTS = load_accounts(config)
+    startup = time.perf_counter() - START_TIME
+    METRICS.set_gauge("startup_seconds", round(startup, 4))
+    logging.info(f"⏱ Start in {startup * 1000:.0f} ms")
+
+    if args.once:
+        sys.exit(run_once(ACCOUNTS))
+
+    start_keepalive()
+    if len(ACCOUNTS) > 1 or LEASES is not None:
+        import asyncio
+        start_update_checker()
+        try:
+            asyncio.run(multi_account_loop(ACCOUNTS, leases=LEASES))
+        finally:
+            NOTIFIER.flush()
+        restart_if_updated()
+        sys.exit(0)
+
+    start_update_checker()
+    try:
+        while True:
+            restart_if_updated()
+            logging.info("Starte neuen Durchlauf...")
+            interval = login_and_check_data()
+            logging.info(f"💤 Warte {interval} Sekunden...")
+            time.sleep(interval if interval is not None else 90)
+    finally:
+        SESSION.close()
+        NOTIFIER.flush()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark für AT-Extender gegen das lokale Mock-Portal
+
+Misst pro Browser-Engine die Latenz des ersten (kalten) und der folgenden
+(warmen) Durchläufe, den Spitzen-RSS der Browser-Prozesse und die vom Portal
+übertragenen Bytes - ganz ohne das echte Portal.
+
+    python benchmark.py --engines chromium,firefox,webkit --runs 5
+
+Mit --remote startet pro Engine ein lokaler Playwright-Browser-Server und das
+Skript verbindet sich über REMOTE_BROWSER damit, statt selbst zu starten.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+
+from mock_portal import MockPortal, start_mock_portal, portal_urls
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "at-extender.py")
+
+
+class RssSampler:
+    """Misst im Hintergrund den RSS aller Kindprozesse und merkt sich den Spitzenwert"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        me = psutil.Process()
+        while not self.stop_event.is_set():
+            rss = 0
+            for child in me.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.peak = max(self.peak, rss)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def browser_server(engine, timeout=30):
+    """Startet einen lokalen Playwright-Browser-Server und liefert seinen WebSocket-Endpunkt"""
+    port = free_port()
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({"port": port, "wsPath": "/at-extender", "headless": True}, f)
+    server = subprocess.Popen([sys.executable, "-m", "playwright", "launch-server", "--browser", engine, "--config", f.name])
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"Browser-Server für {engine} beendet mit Code {server.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Browser-Server für {engine} nicht erreichbar")
+                time.sleep(0.2)
+        yield f"ws://127.0.0.1:{port}/at-extender"
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(f.name)
+
+
+def load_extender(engine, login_url, dashboard_url, data_dir, extra_env):
+    """Lädt at-extender.py als eigenes Modul mit einer auf das Mock-Portal zeigenden Konfiguration"""
+    os.environ.update({
+        "RUFNUMMER": "01700000000",
+        "PASSWORT": "benchmark",
+        "TELEGRAM": "0",
+        "AUTO_UPDATE": "0",
+        "BROWSER": engine,
+        "LOGIN_URL": login_url,
+        "DASHBOARD_URL": dashboard_url,
+        "DATA_DIR": data_dir,
+    })
+    os.environ.update(extra_env)
+    spec = importlib.util.spec_from_file_location(f"at_extender_{engine}", SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_engine(engine, portal, server, runs, extra_env):
+    login_url, dashboard_url = portal_urls(server)
+    with tempfile.TemporaryDirectory() as data_dir:
+        extender = load_extender(engine, login_url, dashboard_url, data_dir, extra_env)
+        latencies = []
+        transferred = []
+        try:
+            with RssSampler() as sampler:
+                for _ in range(runs):
+                    portal.reset_counters()
+                    start = time.monotonic()
+                    extender.login_and_check_data()
+                    latencies.append(time.monotonic() - start)
+                    transferred.append(portal.counters["bytes"])
+        finally:
+            extender.SESSION.close()
+
+    warm = latencies[1:]
+    return {
+        "engine": engine,
+        "cold": latencies[0],
+        "warm": sum(warm) / len(warm) if warm else None,
+        "warm_max": max(warm) if warm else None,
+        "launch": extender.SESSION.launch_time,
+        "peak_rss_mb": sampler.peak / 1024 / 1024,
+        "cold_kb": transferred[0] / 1024,
+        "warm_kb": (sum(transferred[1:]) / len(transferred[1:]) / 1024) if warm else None,
+    }
+
+
+def fmt(value, pattern):
+    return pattern.format(value) if value is not None else "-"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark von AT-Extender gegen das Mock-Portal")
+    parser.add_argument("--engines", default="chromium,firefox,webkit")
+    parser.add_argument("--runs", type=int, default=5, help="Durchläufe pro Engine (der erste ist kalt)")
+    parser.add_argument("--gb", type=float, default=5.0)
+    parser.add_argument("--community-plus", action="store_true")
+    parser.add_argument("--server-render", action="store_true")
+    parser.add_argument("--delay", type=int, default=200)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Zusätzliche Konfiguration, z. B. --env REQUEST_FILTER=1")
+    parser.add_argument("--remote", action="store_true",
+                        help="Über einen lokal gestarteten Browser-Server verbinden statt selbst zu starten")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    portal = MockPortal(args.gb, args.community_plus, not args.server_render, args.delay)
+    server = start_mock_portal(portal)
+
+    results = []
+    for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+        try:
+            if args.remote:
+                with browser_server(engine) as endpoint:
+                    # Ohne Fallback, sonst würde still der lokale Start gemessen
+                    remote_env = dict(extra_env, REMOTE_BROWSER=endpoint, REMOTE_FALLBACK="0")
+                    results.append(bench_engine(engine, portal, server, max(1, args.runs), remote_env))
+            else:
+                results.append(bench_engine(engine, portal, server, max(1, args.runs), extra_env))
+        except Exception as e:
+            print(f"{engine}: Benchmark fehlgeschlagen: {e}", file=sys.stderr)
+
+    server.shutdown()
+
+    print()
+    print(f"{'Engine':<10} {'Start':>8} {'Kalt':>8} {'Warm Ø':>8} {'Warm max':>9} {'Peak RSS':>10} {'KB kalt':>9} {'KB warm':>9}")
+    for r in results:
+        print(f"{r['engine']:<10} {r['launch']:>7.2f}s {r['cold']:>7.2f}s {fmt(r['warm'], '{:>7.2f}s'):>8} "
+              f"{fmt(r['warm_max'], '{:>8.2f}s'):>9} {r['peak_rss_mb']:>8.0f}MB {r['cold_kb']:>9.0f} {fmt(r['warm_kb'], '{:>9.0f}'):>9}")
@@ -5,6 +5,7 @@ Health Check Skript für AT-Extender Docker Container
 
 import sys
 import os
+import glob
 import json
 import time
 from datetime import datetime, timedelta
@@ -15,13 +16,13 @@ def check_health():
     # Prüfen ob der Hauptprozess laufen sollte
     # Wir können die state.json prüfen um zu sehen ob sie kürzlich aktualisiert wurde
     data_dir = os.getenv("DATA_DIR", "/app/data")
-    state_file = os.path.join(data_dir, "state.json")
+    # Einzelkonto: state.json, Multi-Account und Worker: state_<rufnummer>.json - die neueste zählt
+    state_files = glob.glob(os.path.join(data_dir, "state.json")) + glob.glob(os.path.join(data_dir, "state_*.json"))
     
     try:
-        # Prüfen ob state.json existiert und kürzlich aktualisiert wurde
-        if os.path.exists(state_file):
-            stat_info = os.stat(state_file)
-            last_modified = datetime.fromtimestamp(stat_info.st_mtime)
+        # Prüfen ob eine State-Datei existiert und kürzlich aktualisiert wurde
+        if state_files:
+            last_modified = datetime.fromtimestamp(max(os.stat(f).st_mtime for f in state_files))
             
             # Als gesund betrachten wenn state.json in den letzten 2 Stunden aktualisiert wurde
             # (berücksichtigt smart sleep mode der lange Intervalle haben kann)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Lokales Mock-Portal für AT-Extender (Benchmarks und Offline-Tests)
+
+Bildet Login-Formular, Consent-Banner, Kontoübersicht mit usage-meter Markup
+(normal und Community+) sowie den "1 GB" Nachbuchungsbutton nach.
+
+Start:
+    python mock_portal.py --port 8765 --gb 0.8
+
+Dann at-extender.py mit
+    LOGIN_URL=http://127.0.0.1:8765/login/
+    DASHBOARD_URL=http://127.0.0.1:8765/user/auth/account-overview/
+
+Zusätzlich gibt es einen Stub der Telegram Bot API (sendMessage), der die
+Nachrichten sammelt und auf Wunsch mit 429 antwortet:
+    TELEGRAM_API_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import threading
+import time
+import http.server
+import urllib.parse
+
+LOGIN_PATH = "/login/"
+DASHBOARD_PATH = "/user/auth/account-overview/"
+SESSION_COOKIE = "mock_session"
+CONSENT_COOKIE = "uc_consent"
+
+CONSENT_BANNER = """
+<div id="uc-banner" style="position:fixed;bottom:0;left:0;right:0;padding:2em;background:#eee">
+  Wir verwenden Cookies.
+  <button data-testid="uc-accept-all-button">Alle akzeptieren</button>
+  <button data-testid="uc-deny-all-button" onclick="document.cookie='uc_consent=denied; path=/'; document.getElementById('uc-banner').remove();">Verweigern</button>
+</div>
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Login</title>
+<link rel="stylesheet" href="/static/fonts.css"></head>
+<body>
+<one-heading level="h1">Anmelden</one-heading>
+<img src="/static/hero.png" alt="">
+<input id="input-5" name="rufnummer">
+<input id="input-6" name="passwort" type="password">
+<one-button data-type="main-action">
+  <button class="button button--solid button--medium button--color-default button--has-label" id="login">Anmelden</button>
+</one-button>
+%(banner)s
+<script>
+document.getElementById("login").addEventListener("click", async () => {
+  const body = JSON.stringify({rufnummer: document.getElementById("input-5").value,
+                               passwort: document.getElementById("input-6").value});
+  const r = await fetch("/api/login", {method: "POST", body: body, headers: {"Content-Type": "application/json"}});
+  if (r.ok) { setTimeout(() => { location.href = "%(dashboard)s"; }, %(delay)d); }
+});
+</script>
+</body></html>
+"""
+
+DASHBOARD_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Kontoübersicht</title>
+<link rel="stylesheet" href="/static/fonts.css"></head>
+<body>
+<one-heading level="h1">Übersicht</one-heading>
+<img src="/static/hero.png" alt="">
+<div id="meters">%(meters)s</div>
+%(banner)s
+<script>
+function meter(pool, withButton) {
+  return '<one-stack class="usage-meter"><one-usage-meter>' +
+    '<one-group><one-heading level="h3">' + pool.name + '</one-heading><one-heading level="h2">' +
+    String(pool.remaining.value).replace(".", ",") + ' ' + pool.remaining.unit + '</one-heading></one-group>' +
+    '<one-button>' + pool.name + '</one-button>' +
+    (withButton ? '<one-button onclick="topup()"><button>1 GB nachbuchen</button></one-button>' : '<one-button>Details</one-button>') +
+    '</one-usage-meter></one-stack>';
+}
+async function render() {
+  const r = await fetch("/api/usage");
+  const data = await r.json();
+  document.getElementById("meters").innerHTML = data.pools.map((p, i) => meter(p, i === data.pools.length - 1)).join("");
+}
+async function topup() {
+  await fetch("/api/topup", {method: "POST"});
+  await render();
+}
+if (%(spa)s) { setTimeout(render, %(delay)d); }
+</script>
+</body></html>
+"""
+
+
+class MockPortal:
+    """Zustand des Mock-Portals: Restvolumen, Tarifvariante und Zähler"""
+
+    def __init__(self, gb=5.0, community_plus=False, spa=True, delay_ms=200, telegram_rate_limit=0):
+        self.gb = gb
+        self.community_plus = community_plus
+        self.spa = spa
+        self.delay_ms = delay_ms
+        # So viele sendMessage-Aufrufe werden mit 429 beantwortet, bevor der Stub annimmt
+        self.telegram_rate_limit = telegram_rate_limit
+        self.telegram_messages = []
+        self.lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.counters = {"requests": 0, "bytes": 0, "logins": 0, "topups": 0, "telegram": 0}
+
+    def usage(self):
+        pools = [{"name": "Inland", "remaining": {"value": round(self.gb, 2), "unit": "GB"}, "total": {"value": 15, "unit": "GB"}}]
+        if self.community_plus:
+            pools.insert(0, {"name": "Inland & EU", "remaining": {"value": 20, "unit": "GB"}, "total": {"value": 20, "unit": "GB"}})
+        return {"pools": pools, "offer": {"title": "1 GB nachbuchen"}}
+
+    def meters_html(self):
+        # Serverseitig gerendert, wenn das SPA-Verhalten abgeschaltet ist (DOM-Fallback testen)
+        if self.spa:
+            return ""
+        html = ""
+        pools = self.usage()["pools"]
+        for i, pool in enumerate(pools):
+            value = str(pool["remaining"]["value"]).replace(".", ",")
+            button = '<one-button onclick="topup()"><button>1 GB nachbuchen</button></one-button>' if i == len(pools) - 1 else '<one-button>Details</one-button>'
+            html += ('<one-stack class="usage-meter"><one-usage-meter>'
+                     f'<one-group><one-heading level="h3">{pool["name"]}</one-heading><one-heading level="h2">{value} {pool["remaining"]["unit"]}</one-heading></one-group>'
+                     f'<one-button>{pool["name"]}</one-button>{button}'
+                     '</one-usage-meter></one-stack>')
+        return html
+
+
+def make_handler(portal):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def cookies(self):
+            result = {}
+            for part in (self.headers.get("Cookie") or "").split(";"):
+                if "=" in part:
+                    key, value = part.strip().split("=", 1)
+                    result[key] = value
+            return result
+
+        def respond(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+            with portal.lock:
+                portal.counters["requests"] += 1
+                portal.counters["bytes"] += len(body)
+
+        def banner(self):
+            return "" if CONSENT_COOKIE in self.cookies() else CONSENT_BANNER
+
+        def logged_in(self):
+            return self.cookies().get(SESSION_COOKIE) == "ok"
+
+        def do_GET(self):
+            path = urllib.parse.urlsplit(self.path).path
+            if path == LOGIN_PATH:
+                page = LOGIN_PAGE % {"banner": self.banner(), "dashboard": DASHBOARD_PATH, "delay": portal.delay_ms}
+                self.respond(200, page.encode("utf-8"))
+            elif path == DASHBOARD_PATH:
+                if not self.logged_in():
+                    self.respond(302, headers={"Location": LOGIN_PATH})
+                    return
+                page = DASHBOARD_PAGE % {"banner": self.banner(), "meters": portal.meters_html(),
+                                         "spa": "true" if portal.spa else "false", "delay": portal.delay_ms}
+                self.respond(200, page.encode("utf-8"))
+            elif path == "/api/usage":
+                if not self.logged_in():
+                    self.respond(401, b'{"error": "unauthorized"}', "application/json")
+                    return
+                self.respond(200, json.dumps(portal.usage()).encode("utf-8"), "application/json")
+            elif path == "/static/hero.png":
+                self.respond(200, b"\x89PNG\r\n\x1a\n" + b"\0" * 200 * 1024, "image/png")
+            elif path == "/static/fonts.css":
+                self.respond(200, b"body { font-family: sans-serif; }", "text/css")
+            else:
+                self.respond(404, b"not found", "text/plain")
+
+        def do_POST(self):
+            path = urllib.parse.urlsplit(self.path).path
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            if path.startswith("/bot") and path.endswith("/sendMessage"):
+                self.telegram(body)
+            elif path == "/api/login":
+                with portal.lock:
+                    portal.counters["logins"] += 1
+                self.respond(200, b'{"ok": true}', "application/json",
+                             {"Set-Cookie": f"{SESSION_COOKIE}=ok; Path=/"})
+            elif path == "/api/topup" and self.logged_in():
+                with portal.lock:
+                    portal.gb += 1.0
+                    portal.counters["topups"] += 1
+                self.respond(200, json.dumps(portal.usage()).encode("utf-8"), "application/json")
+            else:
+                self.respond(404, b"not found", "text/plain")
+
+        def telegram(self, body):
+            with portal.lock:
+                portal.counters["telegram"] += 1
+                limited = portal.telegram_rate_limit > 0
+                if limited:
+                    portal.telegram_rate_limit -= 1
+                else:
+                    fields = urllib.parse.parse_qs(body.decode("utf-8"))
+                    portal.telegram_messages.append(fields.get("text", [""])[0])
+            if limited:
+                self.respond(429, b'{"ok": false, "error_code": 429, "parameters": {"retry_after": 1}}', "application/json")
+            else:
+                self.respond(200, b'{"ok": true, "result": {}}', "application/json")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_portal(portal, host="127.0.0.1", port=0):
+    """Startet das Mock-Portal in einem Hintergrund-Thread und liefert den Server"""
+    server = http.server.ThreadingHTTPServer((host, port), make_handler(portal))
+    threading.Thread(target=server.serve_forever, name="mock-portal", daemon=True).start()
+    return server
+
+
+def portal_urls(server):
+    host, port = server.server_address[:2]
+    base = f"http://{host}:{port}"
+    return base + LOGIN_PATH, base + DASHBOARD_PATH
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokales Mock-Portal für AT-Extender")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--gb", type=float, default=5.0, help="Restvolumen in GB")
+    parser.add_argument("--community-plus", action="store_true", help="Community+ Variante mit zusätzlichem Inland & EU Meter")
+    parser.add_argument("--server-render", action="store_true", help="Meter serverseitig rendern statt per /api/usage nachzuladen")
+    parser.add_argument("--delay", type=int, default=200, help="Künstliche Verzögerung des SPA-Renderings in ms")
+    args = parser.parse_args()
+
+    portal = MockPortal(args.gb, args.community_plus, not args.server_render, args.delay)
+    server = start_mock_portal(portal, args.host, args.port)
+    login_url, dashboard_url = portal_urls(server)
+    print(f"LOGIN_URL={login_url}")
+    print(f"DASHBOARD_URL={dashboard_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Offline-Simulator für die Intervall-Strategien von AT-Extender
+
+Spielt synthetische oder aufgezeichnete Verbrauchsverläufe mit simulierter Uhr
+durch get_interval() - ganz ohne Browser - und zählt pro Strategie Prüfungen
+(= Browser-Starts) pro Tag, Nachbuchungen, wie oft eine Leitung vor der
+Nachbuchung auf 0 fiel und wie lange sie unter 1 GB bzw. bei 0 lag.
+
+    python simulate.py --policies smart,fixed,random_300-500,predictive --days 14 --rate 0.3 --lines 20
+    python simulate.py --history data/history.db --account 01761234567
+    python simulate.py --trace verbrauch.csv        # Zeilen: Unix-Zeitstempel,Restvolumen in GB
+"""
+
+import argparse
+import csv
+import importlib.util
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "at-extender.py")
+THRESHOLD = 1.0
+TOPUP_GB = 1.0
+# Tagesprofil für synthetische Verläufe: nachts wenig, abends am meisten
+DAY_PROFILE = [0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.5, 0.9, 1.0, 1.0, 1.0, 1.1,
+               1.2, 1.1, 1.0, 1.0, 1.1, 1.3, 1.6, 1.9, 2.0, 1.8, 1.2, 0.6]
+
+
+def load_extender(data_dir):
+    """Lädt at-extender.py als Modul - ohne Telegram, Updates und Verlauf"""
+    os.environ.update({
+        "RUFNUMMER": os.environ.get("RUFNUMMER") or "simulation",
+        "PASSWORT": os.environ.get("PASSWORT") or "simulation",
+        "TELEGRAM": "0",
+        "AUTO_UPDATE": "0",
+        "HISTORY": "0",
+        "DATA_DIR": data_dir,
+    })
+    spec = importlib.util.spec_from_file_location("at_extender_sim", SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # Die Strategien loggen jede Entscheidung - in der Simulation nur Warnungen zeigen
+    logging.getLogger().setLevel(logging.WARNING)
+    return module
+
+
+def synthetic_trace(rate, days, start, rng, noise=0.3):
+    """Stündliche Verbrauchsraten (GB/h) mit Tagesprofil und log-normalem Rauschen"""
+    mean = sum(DAY_PROFILE) / len(DAY_PROFILE)
+    segments = []
+    for hour in range(int(days * 24)):
+        t = start + hour * 3600
+        factor = DAY_PROFILE[time.localtime(t).tm_hour] / mean
+        segments.append((t, t + 3600, rate * factor * rng.lognormvariate(0, noise)))
+    return segments
+
+
+def recorded_trace(readings):
+    """Verbrauchsraten zwischen aufeinanderfolgenden Messungen, Nachbuchungen übernehmen die letzte Rate"""
+    segments = []
+    last_rate = 0.0
+    for (t0, gb0), (t1, gb1) in zip(readings, readings[1:]):
+        if t1 <= t0:
+            continue
+        if gb1 <= gb0:
+            last_rate = (gb0 - gb1) / ((t1 - t0) / 3600)
+        segments.append((t0, t1, last_rate))
+    return segments
+
+
+def read_csv_trace(path):
+    with open(path, newline="") as f:
+        return [(float(row[0]), float(row[1])) for row in csv.reader(f) if row and not row[0].startswith("#")]
+
+
+def read_history_trace(extender, path, account, days):
+    store = extender.HistoryStore(path)
+    try:
+        return store.readings(account, time.time() - days * 86400)
+    finally:
+        store.close()
+
+
+class Line:
+    """Simulierte Leitung: Restvolumen folgt den Verbrauchsraten, Nachbuchung nur bei einer Prüfung"""
+
+    def __init__(self, segments, gb):
+        self.segments = segments
+        self.index = 0
+        self.gb = gb
+        self.below = 0.0
+        self.empty = 0.0
+        self.drops = 0
+
+    def advance(self, t0, t1):
+        """Verbraucht von t0 bis t1 und zählt die Zeit unter der Schwelle und bei 0"""
+        t = t0
+        while t < t1 and self.index < len(self.segments):
+            start, end, rate = self.segments[self.index]
+            if t >= end:
+                self.index += 1
+                continue
+            step_end = min(t1, end)
+            hours = (step_end - max(t, start)) / 3600
+            self.consume(rate, hours)
+            t = step_end
+
+    def consume(self, rate, hours):
+        if rate <= 0 or hours <= 0:
+            self.below += hours * 3600 if self.gb < THRESHOLD else 0
+            self.empty += hours * 3600 if self.gb <= 0 else 0
+            return
+        before = self.gb
+        after = before - rate * hours
+        # Zeitpunkte der Schwellen-Übergänge innerhalb des Schritts mit konstanter Rate
+        above_threshold = max(0.0, min(hours, (before - THRESHOLD) / rate))
+        above_zero = max(0.0, min(hours, before / rate))
+        self.below += (hours - above_threshold) * 3600
+        self.empty += (hours - above_zero) * 3600
+        if before > 0 >= after:
+            self.drops += 1
+        self.gb = max(0.0, after)
+
+
+def simulate(extender, policy, segments, start_gb, burst, sleep_interval):
+    """Ein Durchlauf einer Strategie über einen Verlauf, liefert die Kennzahlen"""
+    config = {"SLEEP_MODE": policy, "SLEEP_INTERVAL": str(sleep_interval)}
+    start, end = segments[0][0], segments[-1][1]
+    line = Line(segments, start_gb)
+    readings = []
+    checks = topups = 0
+    t = start
+    while t < end:
+        checks += 1
+        booked = 0
+        while line.gb < THRESHOLD and booked < burst:
+            line.gb += TOPUP_GB
+            booked += 1
+        topups += booked
+        readings.append((t, round(line.gb, 2)))
+        # Wie der Verlauf: nur die letzten 7 Tage gehen in die Vorhersage ein
+        while readings and readings[0][0] < t - 7 * 86400:
+            readings.pop(0)
+        interval = extender.get_interval(config, line.gb, "simulation", now=t, readings=list(readings))
+        interval = max(1, interval if interval is not None else 90)
+        line.advance(t, min(end, t + interval))
+        t += interval
+
+    days = (end - start) / 86400
+    return {
+        "checks_per_day": checks / days,
+        "topups": topups,
+        "drops": line.drops,
+        "below_hours": line.below / 3600,
+        "empty_hours": line.empty / 3600,
+        "below_share": line.below / (end - start),
+    }
+
+
+def aggregate(results):
+    """Mittelwert über alle Leitungen, Ereignisse als Summe"""
+    n = len(results)
+    return {
+        "checks_per_day": sum(r["checks_per_day"] for r in results) / n,
+        "fleet_checks_per_day": sum(r["checks_per_day"] for r in results),
+        "topups": sum(r["topups"] for r in results),
+        "drops": sum(r["drops"] for r in results),
+        "below_hours": sum(r["below_hours"] for r in results) / n,
+        "empty_hours": sum(r["empty_hours"] for r in results) / n,
+        "below_share": sum(r["below_share"] for r in results) / n,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulator für die Intervall-Strategien von AT-Extender")
+    parser.add_argument("--policies", default="smart,fixed,random_300-500,predictive",
+                        help="Kommagetrennte SLEEP_MODE-Werte")
+    parser.add_argument("--sleep-interval", type=int, default=70, help="SLEEP_INTERVAL für fixed")
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--rate", type=float, default=0.3, help="Mittlerer Verbrauch in GB/h (synthetisch)")
+    parser.add_argument("--spread", type=float, default=0.5,
+                        help="Streuung der Verbrauchsraten zwischen den Leitungen (log-normal, synthetisch)")
+    parser.add_argument("--lines", type=int, default=10, help="Anzahl synthetischer Leitungen")
+    parser.add_argument("--start-gb", type=float, default=5.0)
+    parser.add_argument("--burst", type=int, default=None, help="Nachbuchungen pro Prüfung (Standard: TOPUP_BURST_MAX)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace", help="CSV mit Zeitstempel,GB statt synthetischer Verläufe")
+    parser.add_argument("--history", help="history.db, deren Messwerte als Verlauf abgespielt werden")
+    parser.add_argument("--account", help="Konto aus --history (Standard: alle)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        extender = load_extender(data_dir)
+        burst = args.burst or extender.TOPUP_BURST_MAX
+
+        if args.trace:
+            traces = {os.path.basename(args.trace): recorded_trace(read_csv_trace(args.trace))}
+        elif args.history:
+            store = extender.HistoryStore(args.history)
+            accounts = [args.account] if args.account else store.accounts()
+            store.close()
+            traces = {a: recorded_trace(read_history_trace(extender, args.history, a, args.days)) for a in accounts}
+        else:
+            rng = random.Random(args.seed)
+            start = math.floor(time.time() / 86400) * 86400
+            traces = {f"synthetisch-{i + 1}": synthetic_trace(args.rate * rng.lognormvariate(0, args.spread), args.days, start, rng)
+                      for i in range(args.lines)}
+        traces = {name: segments for name, segments in traces.items() if segments}
+        if not traces:
+            print("Kein Verlauf mit mindestens zwei Messwerten gefunden.", file=sys.stderr)
+            sys.exit(1)
+
+        results = []
+        for policy in [p.strip() for p in args.policies.split(",") if p.strip()]:
+            # Gleiche Zufallsfolge für jede Strategie, damit die Zahlen vergleichbar sind
+            random.seed(args.seed)
+            runs = [simulate(extender, policy, segments, args.start_gb, burst, args.sleep_interval)
+                    for segments in traces.values()]
+            results.append((policy, aggregate(runs)))
+
+    print()
+    print(f"{len(traces)} Verläufe, Nachbuchung bei < {THRESHOLD:.0f} GB, bis zu {burst} pro Prüfung")
+    print(f"{'Strategie':<18} {'Prüf./Tag':>10} {'Flotte/Tag':>11} {'Nachbuch.':>10} {'Auf 0':>7} {'< 1 GB':>9} {'Bei 0':>8} {'Anteil':>7}")
+    for policy, r in results:
+        print(f"{policy:<18} {r['checks_per_day']:>10.1f} {r['fleet_checks_per_day']:>11.0f} {r['topups']:>10} {r['drops']:>7} "
+              f"{r['below_hours']:>8.1f}h {r['empty_hours']:>7.1f}h {r['below_share']:>6.1%}")
@@ -0,0 +1,59 @@
+import importlib.util
+import os
+import socket
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_portal import MockPortal, start_mock_portal  # noqa: E402
+
+SCRIPT_PATH = os.path.join(ROOT, "at-extender.py")
+
+
+@pytest.fixture
+def load_extender(monkeypatch, tmp_path):
+    """Lädt at-extender.py als frisches Modul - jeder Aufruf entspricht einem Neustart des Skripts"""
+    loaded = []
+
+    def load(**env):
+        settings = {
+            "RUFNUMMER": "01700000000",
+            "PASSWORT": "test",
+            "TELEGRAM": "0",
+            "AUTO_UPDATE": "0",
+            "HISTORY": "0",
+            "DATA_DIR": str(tmp_path),
+        }
+        settings.update(env)
+        for key, value in settings.items():
+            monkeypatch.setenv(key, str(value))
+        spec = importlib.util.spec_from_file_location(f"at_extender_test_{len(loaded)}", SCRIPT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        loaded.append(module)
+        return module
+
+    return load
+
+
+@pytest.fixture
+def portal():
+    portal = MockPortal(delay_ms=0)
+    server = start_mock_portal(portal)
+    portal.server = server
+    portal.base_url = "http://%s:%s" % server.server_address[:2]
+    yield portal
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dead_url():
+    """URL, an der garantiert niemand lauscht"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
@@ -0,0 +1,58 @@
+import json
+
+
+class BrowserSessionSpy:
+    """Ersetzt die Browser-Session: zählt, ob der Browser-Pfad betreten wird, ohne einen Browser zu starten"""
+
+    def __init__(self, extender):
+        self.extender = extender
+        self.acquired = 0
+        self.page = None
+        self.request_filter = None
+
+    def acquire(self):
+        self.acquired += 1
+        raise self.extender.PortalError("portal_down", "Browser im Test nicht verfügbar")
+
+    def recycle(self):
+        pass
+
+
+def load_fast_path(load_extender, portal, session_cookie):
+    extender = load_extender(HTTP_FASTPATH="1", USAGE_API_URL=portal.base_url + "/api/usage")
+    with open(extender.COOKIE_FILE, "w") as f:
+        json.dump({"cookies": [{"name": "mock_session", "value": session_cookie, "domain": "127.0.0.1", "path": "/"}],
+                   "origins": []}, f)
+    extender.SESSION = BrowserSessionSpy(extender)
+    return extender
+
+
+def test_reads_usage_over_http(load_extender, portal):
+    portal.gb = 3.5
+    extender = load_fast_path(load_extender, portal, "ok")
+
+    assert extender.http_read_datenvolumen() == (3.5, False)
+
+    extender.check_data()
+    assert extender.SESSION.acquired == 0
+    assert extender.load_last_gb(extender.STATE_FILE) == 3.5
+
+
+def test_rejected_session_falls_back_to_browser(load_extender, portal):
+    extender = load_fast_path(load_extender, portal, "abgelaufen")
+
+    # /api/usage antwortet ohne gültige Session mit 401
+    assert extender.http_read_datenvolumen() is None
+
+    extender.check_data()
+    assert extender.SESSION.acquired == 1
+
+
+def test_low_volume_uses_browser_for_topup(load_extender, portal):
+    portal.gb = 0.4
+    extender = load_fast_path(load_extender, portal, "ok")
+
+    assert extender.http_read_datenvolumen() == (0.4, False)
+
+    extender.check_data()
+    assert extender.SESSION.acquired == 1
@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+import pytest
+
+from mock_portal import portal_urls
+
+
+class NavigatingPage:
+    """Login-Seite mit eigener h1, die nach ein paar Polls auf die Übersicht weiterleitet"""
+
+    def __init__(self, login_url, dashboard_url, polls_until_redirect=3):
+        self.url = login_url
+        self.dashboard_url = dashboard_url
+        self.polls_until_redirect = polls_until_redirect
+
+    async def text_content(self, selector, timeout=None):
+        return "Übersicht" if self.url == self.dashboard_url else "Anmelden"
+
+    async def wait_for_timeout(self, ms):
+        self.polls_until_redirect -= 1
+        if self.polls_until_redirect <= 0:
+            self.url = self.dashboard_url
+
+
+def test_login_check_ignores_heading_of_login_page(load_extender, portal):
+    login_url, dashboard_url = portal_urls(portal.server)
+    extender = load_extender(LOGIN_URL=login_url, DASHBOARD_URL=dashboard_url)
+
+    page = NavigatingPage(login_url, dashboard_url)
+    assert asyncio.run(extender.login_erfolgreich_async(page, timeout=5000))
+
+    stuck = NavigatingPage(login_url, dashboard_url, polls_until_redirect=10 ** 6)
+    assert not asyncio.run(extender.login_erfolgreich_async(stuck, timeout=300))
+
+
+@pytest.fixture(scope="module")
+def chromium_installed():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    with sync_api.sync_playwright() as playwright:
+        installed = os.path.exists(playwright.chromium.executable_path)
+    if not installed:
+        pytest.skip("Chromium für Playwright ist nicht installiert")
+
+
+def test_check_account_logs_in_against_mock_portal(load_extender, portal, chromium_installed, tmp_path):
+    from playwright.async_api import async_playwright
+
+    portal.gb = 4.0
+    login_url, dashboard_url = portal_urls(portal.server)
+    extender = load_extender(LOGIN_URL=login_url, DASHBOARD_URL=dashboard_url, BROWSER="chromium")
+    account = {"RUFNUMMER": "01700000001", "PASSWORT": "test",
+               "STATE_FILE": str(tmp_path / "state_01700000001.json"),
+               "COOKIE_FILE": str(tmp_path / "cookies_01700000001.json")}
+
+    async def run():
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                return await extender.check_account_async(browser, account, asyncio.Semaphore(1))
+            finally:
+                await browser.close()
+
+    interval = asyncio.run(run())
+
+    assert interval is not None
+    assert portal.counters["logins"] == 1
+    assert extender.load_last_gb(account["STATE_FILE"]) == 4.0
+    assert extender.RUN_RESULTS.get("01700000001")
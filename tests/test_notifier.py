@@ -0,0 +1,75 @@
+import json
+import os
+import time
+
+
+def telegram_env(url, **extra):
+    env = {"TELEGRAM": "1", "BOT_TOKEN": "123:test", "CHAT_ID": "42", "TELEGRAM_API_URL": url,
+           "TELEGRAM_BATCH_SECONDS": "0"}
+    env.update(extra)
+    return env
+
+
+def test_rate_limit_waits_retry_after(load_extender, portal):
+    portal.telegram_rate_limit = 1
+    extender = load_extender(**telegram_env(portal.base_url))
+
+    start = time.monotonic()
+    extender.send_telegram_message("Noch 5.00 GB übrig.")
+    assert extender.NOTIFIER.flush(10)
+
+    # Erst 429 mit retry_after=1, dann zugestellt - genau einmal
+    assert portal.counters["telegram"] == 2
+    assert portal.telegram_messages == ["Noch 5.00 GB übrig."]
+    assert time.monotonic() - start >= 1
+
+
+def test_messages_in_batch_window_become_one_digest(load_extender, portal):
+    extender = load_extender(**telegram_env(portal.base_url, TELEGRAM_BATCH_SECONDS="1"))
+
+    for account in ("0170111", "0170222", "0170333"):
+        extender.send_telegram_message(f"{account}: Noch 5.00 GB übrig.")
+    assert extender.NOTIFIER.flush(10)
+
+    assert portal.counters["telegram"] == 1
+    assert portal.telegram_messages == ["0170111: Noch 5.00 GB übrig.\n0170222: Noch 5.00 GB übrig.\n0170333: Noch 5.00 GB übrig."]
+
+
+def test_queue_is_resent_after_restart(load_extender, portal, dead_url, tmp_path):
+    extender = load_extender(**telegram_env(dead_url))
+    extender.send_telegram_message("Nachbuchung bestätigt.")
+    assert not extender.NOTIFIER.flush(0.5)
+
+    queue_file = os.path.join(tmp_path, "telegram_queue.json")
+    with open(queue_file) as f:
+        assert json.load(f) == ["Nachbuchung bestätigt."]
+
+    # Neustart mit erreichbarer API: wie main() die Warteschlange übernehmen und senden
+    restarted = load_extender(**telegram_env(portal.base_url))
+    restarted.NOTIFIER.load_queue()
+    restarted.NOTIFIER.start()
+    assert restarted.NOTIFIER.flush(10)
+
+    assert portal.telegram_messages == ["Nachbuchung bestätigt."]
+    with open(queue_file) as f:
+        assert json.load(f) == []
+
+
+def test_unexpected_error_does_not_kill_the_sender(load_extender, portal):
+    extender = load_extender(**telegram_env(portal.base_url))
+    post = extender.NOTIFIER.post
+    calls = []
+
+    def flaky_post(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise ValueError("kaputt")
+        return post(text)
+
+    extender.NOTIFIER.post = flaky_post
+    extender.send_telegram_message("Noch 5.00 GB übrig.")
+    assert extender.NOTIFIER.flush(10)
+
+    assert len(calls) == 2
+    assert extender.NOTIFIER.thread.is_alive()
+    assert portal.telegram_messages == ["Noch 5.00 GB übrig."]
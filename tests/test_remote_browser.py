@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+
+sync_api = pytest.importorskip("playwright.sync_api")
+
+
+@pytest.fixture
+def playwright():
+    playwright = sync_api.sync_playwright().start()
+    yield playwright
+    playwright.stop()
+
+
+@pytest.fixture(scope="module")
+def chromium_installed():
+    with sync_api.sync_playwright() as playwright:
+        installed = os.path.exists(playwright.chromium.executable_path)
+    if not installed:
+        pytest.skip("Chromium für Playwright ist nicht installiert")
+
+
+@pytest.fixture
+def stealth():
+    # launch() lädt playwright_stealth mit - ohne das Paket nur die Verbindung selbst testen
+    pytest.importorskip("playwright_stealth.sync")
+
+
+def remote_session(extender, playwright):
+    session = extender.BrowserSession("chromium")
+    session.playwright = playwright
+    return session
+
+
+def test_unreachable_server_without_fallback_is_browser_error(load_extender, playwright, dead_url):
+    extender = load_extender(BROWSER="chromium", REMOTE_BROWSER=dead_url.replace("http", "ws"), REMOTE_FALLBACK="0",
+                             READY_TIMEOUT="5")
+    session = remote_session(extender, playwright)
+
+    with pytest.raises(extender.PortalError) as error:
+        session.connect()
+    assert extender.classify_error(error.value) == "browser"
+
+
+def test_unreachable_server_with_fallback_waits_before_retrying(load_extender, playwright, dead_url):
+    extender = load_extender(BROWSER="chromium", REMOTE_BROWSER=dead_url.replace("http", "ws"), REMOTE_RETRY="300",
+                             READY_TIMEOUT="5")
+    session = remote_session(extender, playwright)
+
+    assert session.connect() is False
+    assert not session.remote
+    assert session.remote_retry_at > time.monotonic() + 200
+    # Bis REMOTE_RETRY abgelaufen ist, wird gar nicht erst verbunden
+    assert session.connect() is False
+
+
+def test_connects_to_local_launch_server(load_extender, chromium_installed, playwright):
+    from benchmark import browser_server
+
+    with browser_server("chromium") as endpoint:
+        extender = load_extender(BROWSER="chromium", REMOTE_BROWSER=endpoint)
+        session = remote_session(extender, playwright)
+        try:
+            assert session.connect() is True
+            assert session.remote and session.is_alive()
+            page = session.browser.new_context().new_page()
+            page.set_content("<h1>ok</h1>")
+            assert page.text_content("h1") == "ok"
+        finally:
+            session.recycle()
+
+
+def test_falls_back_to_local_browser_and_reconnects(load_extender, playwright, chromium_installed, stealth, dead_url):
+    from benchmark import browser_server
+
+    extender = load_extender(BROWSER="chromium", REMOTE_BROWSER=dead_url.replace("http", "ws"), READY_TIMEOUT="5")
+    session = extender.BrowserSession("chromium")
+    try:
+        session.launch()
+        assert session.is_alive() and not session.remote
+
+        with browser_server("chromium") as endpoint:
+            # Server ist wieder da und REMOTE_RETRY abgelaufen: der lokale Ersatz wird gegen den entfernten getauscht
+            extender.REMOTE_BROWSER = endpoint
+            session.remote_retry_at = 0
+            session.acquire()
+            assert session.remote and session.is_alive()
+            session.recycle()
+    finally:
+        session.close()